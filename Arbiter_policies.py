@@ -0,0 +1,333 @@
+__author__ = 'shahargino'
+
+
+from collections import OrderedDict
+
+
+# ----------------------------------------------------------------------------------------
+def next_set_bit(mask, index):
+    """Returns the first set bit of a (non-zero) mask after the given bit index, cyclically"""
+
+    higher = mask >> (index + 1)
+    if higher:
+        return index + (higher & -higher).bit_length()
+
+    return (mask & -mask).bit_length() - 1
+
+
+class Arbiter_policy(object):
+    """
+        This class is the base of the Fabric arbiter's grant policies (see POLICIES below)
+
+        Notes:
+        ~~~~~~
+        (1) Initiators are referred to by their index within the fabric's initiators, requesters by a bitmask
+        (2) select() is called at every slot boundary, with the slot's former owner and the (non-zero) mask of the
+            candidates, it advances the policy's schedule (e.g. WRR credits, TDMA position). handover() is called
+            upon a work-conserving handover (see Fabric_arbiter), with the currently granted initiator, it picks a
+            candidate for the rest of the slot and leaves the schedule as is. Stateless policies hand over as they
+            select.
+        (3) Candidates are all the initiators, unless the arbiter is work-conserving or the policy USES_READY,
+            in which case only initiators with pending requests are candidates
+        (4) skip() applies select() on a number of consecutive slot boundaries, with the same candidates. The grants
+            are periodic (see get_period()), hence the number of boundaries is first reduced modulo the period,
+            i.e. skipped slots do not cost a select() each.
+        (5) set_ready() is called by a ready-tracking arbiter upon every change of an initiator's ready bit, and
+            sample_ready() before the first change within a time step (see Fabric_arbiter.set_ready). Policies may
+            maintain per-candidates state incrementally out of these, rather than per candidates mask.
+    """
+
+    USES_READY = False
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initiators, params):
+
+        self.initiators = initiators
+        self.params = params
+        self.all_initiators = (1 << len(initiators)) - 1
+
+    # ----------------------------------------------------------------------------------------
+    def start(self, granted):
+        """Returns the initially granted initiator (START_AT)"""
+
+        return granted
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        raise NotImplementedError
+
+    # ----------------------------------------------------------------------------------------
+    def set_ready(self, index, ready):
+
+        pass
+
+    # ----------------------------------------------------------------------------------------
+    def sample_ready(self):
+
+        pass
+
+    # ----------------------------------------------------------------------------------------
+    def handover(self, granted, candidates):
+
+        return self.select(granted, candidates)
+
+    # ----------------------------------------------------------------------------------------
+    def get_period(self, candidates):
+        """
+            Returns the period of the policy's state over slot boundaries with the given candidates, the periodic
+            states are reached (from any state) within a period
+        """
+
+        return bin(candidates).count('1')
+
+    # ----------------------------------------------------------------------------------------
+    def skip(self, granted, candidates, slots):
+        """Returns the initiator granted after the given number of slot boundaries, with the same candidates"""
+
+        period = self.get_period(candidates)
+        if slots > period:
+            slots = period + (slots - period) % period
+
+        for _ in range(slots):
+            granted = self.select(granted, candidates)
+
+        return granted
+
+
+class Round_robin_policy(Arbiter_policy):
+    """Grants the candidates in turns, a single slot each"""
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        return next_set_bit(candidates, granted)
+
+    # ----------------------------------------------------------------------------------------
+    def skip(self, granted, candidates, slots):
+
+        # All the initiators take turns in index order:
+        if candidates == self.all_initiators:
+            return (granted + slots) % len(self.initiators)
+
+        return Arbiter_policy.skip(self, granted, candidates, slots)
+
+
+class Weighted_round_robin_policy(Arbiter_policy):
+    """Grants the candidates in turns, WEIGHTS[initiator] consecutive slots each (1 by default)"""
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initiators, params):
+
+        Arbiter_policy.__init__(self, initiators, params)
+
+        self.weights = [params.WEIGHTS.get(name, 1) for name in initiators]
+        self.credits = 0
+
+    # ----------------------------------------------------------------------------------------
+    def start(self, granted):
+
+        self.credits = self.weights[granted] - 1
+        return granted
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        if self.credits and (candidates >> granted) & 1:
+            self.credits -= 1
+            return granted
+
+        granted = next_set_bit(candidates, granted)
+        self.credits = self.weights[granted] - 1
+
+        return granted
+
+    # ----------------------------------------------------------------------------------------
+    def handover(self, granted, candidates):
+
+        return next_set_bit(candidates, granted)
+
+    # ----------------------------------------------------------------------------------------
+    def get_period(self, candidates):
+
+        # A full turn of the candidates (the first slot boundary may end a partial one):
+        return sum(weight for index, weight in enumerate(self.weights) if (candidates >> index) & 1)
+
+
+class Strict_priority_policy(Arbiter_policy):
+    """
+        Grants the highest PRIORITIES[initiator] (0 by default) initiator with pending requests,
+        initiators of the same priority are granted in turns
+    """
+
+    USES_READY = True
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initiators, params):
+
+        Arbiter_policy.__init__(self, initiators, params)
+
+        priorities = [params.PRIORITIES.get(name, 0) for name in initiators]
+
+        # One mask per priority level, highest first:
+        self.levels = [sum(1 << index for index, priority in enumerate(priorities) if priority == level)
+                       for level in sorted(set(priorities), reverse=True)]
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        for level in self.levels:
+            if candidates & level:
+                return next_set_bit(candidates & level, granted)
+
+        return granted
+
+    # ----------------------------------------------------------------------------------------
+    def get_period(self, candidates):
+
+        # The highest priority candidates only:
+        for level in self.levels:
+            if candidates & level:
+                return bin(candidates & level).count('1')
+
+        return 1
+
+
+class Least_recently_granted_policy(Arbiter_policy):
+    """Grants the candidate which has not been granted for the longest time"""
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initiators, params):
+
+        Arbiter_policy.__init__(self, initiators, params)
+
+        self.order = OrderedDict((index, None) for index in range(len(initiators)))
+
+    # ----------------------------------------------------------------------------------------
+    def start(self, granted):
+
+        self.order.move_to_end(granted)
+        return granted
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        index = self.handover(granted, candidates)
+        self.order.move_to_end(index)
+
+        return index
+
+    # ----------------------------------------------------------------------------------------
+    def handover(self, granted, candidates):
+
+        # Least recently granted first, hence only idle initiators are skipped:
+        for index in self.order:
+            if (candidates >> index) & 1:
+                return index
+
+        return granted
+
+
+class Tdma_policy(Arbiter_policy):
+    """
+        Grants the slots by a fixed, repeating SCHEDULE of initiators (all the initiators in order by default),
+        the next scheduled candidate is looked up by a bitmask of its schedule positions. The positions of the ready
+        initiators (and of the sampled ones, see Arbiter_policy note 5) are maintained incrementally.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initiators, params):
+
+        Arbiter_policy.__init__(self, initiators, params)
+
+        self.schedule = [initiators.index(name) for name in params.SCHEDULE or initiators]
+        self.position = 0
+
+        # Schedule positions, as a bitmask per initiator, of all the initiators and of the ready (and sampled) ones:
+        self.initiator_positions = [sum(1 << position for position, index in enumerate(self.schedule) if index == i)
+                                    for i in range(len(initiators))]
+        self.all_positions = (1 << len(self.schedule)) - 1
+        self.ready = self.ready_positions = 0
+        self.sampled = self.sampled_positions = 0
+
+    # ----------------------------------------------------------------------------------------
+    def start(self, granted):
+
+        self.position = self.schedule.index(granted) if granted in self.schedule else 0
+        return self.schedule[self.position]
+
+    # ----------------------------------------------------------------------------------------
+    def select(self, granted, candidates):
+
+        position = self.next_position(candidates)
+        if position is None:
+            return granted
+
+        self.position = position
+        return self.schedule[position]
+
+    # ----------------------------------------------------------------------------------------
+    def handover(self, granted, candidates):
+
+        position = self.next_position(candidates)
+        return granted if position is None else self.schedule[position]
+
+    # ----------------------------------------------------------------------------------------
+    def get_period(self, candidates):
+
+        return max(1, bin(self.get_positions(candidates)).count('1'))
+
+    # ----------------------------------------------------------------------------------------
+    def skip(self, granted, candidates, slots):
+
+        # Every position is scheduled in turn:
+        if candidates == self.all_initiators:
+            self.position = (self.position + slots) % len(self.schedule)
+            return self.schedule[self.position]
+
+        return Arbiter_policy.skip(self, granted, candidates, slots)
+
+    # ----------------------------------------------------------------------------------------
+    def set_ready(self, index, ready):
+
+        if ready:
+            self.ready |= 1 << index
+            self.ready_positions |= self.initiator_positions[index]
+        else:
+            self.ready &= ~(1 << index)
+            self.ready_positions &= ~self.initiator_positions[index]
+
+    # ----------------------------------------------------------------------------------------
+    def sample_ready(self):
+
+        self.sampled = self.ready
+        self.sampled_positions = self.ready_positions
+
+    # ----------------------------------------------------------------------------------------
+    def get_positions(self, candidates):
+        """Returns the bitmask of the candidates' schedule positions"""
+
+        if candidates == self.sampled:
+            return self.sampled_positions
+        if candidates == self.ready:
+            return self.ready_positions
+        if candidates == self.all_initiators:
+            return self.all_positions
+
+        return sum(mask for index, mask in enumerate(self.initiator_positions) if (candidates >> index) & 1)
+
+    # ----------------------------------------------------------------------------------------
+    def next_position(self, candidates):
+        """Returns the next schedule position (cyclically) of a candidate, None if none is scheduled"""
+
+        positions = self.get_positions(candidates)
+        return next_set_bit(positions, self.position) if positions else None
+
+
+POLICIES = {
+    'ROUND_ROBIN':             Round_robin_policy,
+    'WEIGHTED_ROUND_ROBIN':    Weighted_round_robin_policy,
+    'STRICT_PRIORITY':         Strict_priority_policy,
+    'LEAST_RECENTLY_GRANTED':  Least_recently_granted_policy,
+    'TDMA':                    Tdma_policy
+}
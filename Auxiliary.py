@@ -3,20 +3,65 @@ __author__ = 'shahargino'
 
 from sys import exit
 from datetime import datetime
+from collections import deque
 
 
 class Auxiliary(object):
-    """This class comprises general auxiliary methods, such as printing, error message, etc."""
+    """
+        This class comprises general auxiliary methods, such as printing, error message, etc.
+
+        Debug logging notes:
+        ~~~~~~~~~~~~~~~~~~~~
+        (1) Levels: 0 = disabled, 1 = DEBUG, 2 = DETAILED (e.g. full queue contents)
+        (2) The level can be overridden per component, by name prefix (e.g. {'Initiator_queue': 0})
+        (3) Message formatting is lazy: debug(tag, '%s', arg) formats only when the record is printed
+        (4) Hot call sites cache debug_enabled() once and guard their debug() calls (and any loop built
+            only for logging) with it, hence disabled logging costs a single attribute check
+        (5) An optional fixed-size ring buffer keeps the latest DEBUG records, unformatted, even when
+            printing is disabled. It is dumped upon error().
+    """
+
+    DEBUG = 1
+    DETAILED = 2
 
     # ----------------------------------------------------------------------------------------
-    def __init__(self, env, verbose):
+    def __init__(self, env, verbose, components=None, ring_size=0):
         self.env = env
         self.verbose = verbose
+        self.components = components or {}
+        self.levels = {}
+        self.ring = deque(maxlen=ring_size) if ring_size else None
+
+    # ----------------------------------------------------------------------------------------
+    def get_level(self, tag):
+        """Returns the debug level of a component, i.e. its longest matching prefix override or DEBUG_LEVEL"""
+
+        if tag not in self.levels:
+            prefixes = [prefix for prefix in self.components if tag.startswith(prefix)]
+            self.levels[tag] = self.components[max(prefixes, key=len)] if prefixes else self.verbose
+
+        return self.levels[tag]
+
+    # ----------------------------------------------------------------------------------------
+    def debug_enabled(self, tag, level=DEBUG):
+
+        return self.get_level(tag) >= level or (self.ring is not None and level <= self.DEBUG)
+
+    # ----------------------------------------------------------------------------------------
+    def debug(self, tag, msg, *args, level=DEBUG):
+        if self.ring is not None and level <= self.DEBUG:
+            self.ring.append((self.env.now, tag, msg, args))
+        if self.get_level(tag) >= level:
+            print("[%.02f ns] [%s] %s" % (self.env.now, tag, msg % args if args else msg))
 
     # ----------------------------------------------------------------------------------------
-    def debug(self, tag, msg):
-        if self.verbose: #and 'CPU' in tag and 'RD' not in tag and 'RD' not in msg:
-            print("[%.02f ns] [%s] %s" % (self.env.now, tag, msg))
+    def dump(self):
+        if self.ring:
+            print("-"*70)
+            print("Last %d debug records:" % len(self.ring))
+            for now, tag, msg, args in self.ring:
+                print("[%.02f ns] [%s] %s" % (now, tag, msg % args if args else msg))
+            print("-"*70)
 
     # ----------------------------------------------------------------------------------------
     def message(self, tag, msg):
@@ -31,5 +76,6 @@ class Auxiliary(object):
 
     # ----------------------------------------------------------------------------------------
     def error(self, tag, msg):
+        self.dump()
         print("[%.02f ns] [ERROR] %s: %s" % (self.env.now, tag, msg))
         exit()
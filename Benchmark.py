@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+#  ___               _                 _
+# | _ ) ___ _ _  __| |_  _ __  __ _ _ _| |__
+# | _ \/ -_) ' \/ _| ' \| '  \/ _` | '_| / /
+# |___/\___|_||_\__|_||_|_|_|_\__,_|_| |_\_\
+#
+# Measures how the simulator scales, over synthetic testbenches of N initiators x P procedures x M targets.
+#
+# Testbenches are generated out of include.py, used as a template: every initiator is a copy of the CPU initiator
+# (its procedures cycled P times, one queue per procedure), every target is a copy of SRAM, all of them connected
+# to a single fabric (the CPU and SRAM sockets used as templates, with the CPU-to-SRAM latency).
+#
+# Each benchmark runs for a fixed simulated time, in its own process (hence its own peak RSS), and reports:
+# build and run wall times, events processed, events per second, simulated ns per wall second and peak RSS.
+#
+# Usage example (JSON results, one record per N):
+#
+#     Benchmark.py -n 2,8,32,128,512,1024 -p 2 -m 4 -t 10000 -e EVENT_DRIVEN -o benchmark.json
+
+import sys
+import json
+import time
+import getopt
+import platform
+from copy import deepcopy
+from multiprocessing import Pool
+
+import simpy
+import include as inc
+from main import environment, configure, build
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+INITIATOR_TEMPLATE = 'CPU'
+TARGET_TEMPLATE = 'SRAM'
+
+
+# ----------------------------------------------------------------------------------------
+def usage():
+    print('Benchmark.py [-n <initiators,...>] [-p <procedures>] [-m <targets>] [-t <sim_time_ns>] '
+          '[-e <EXECUTION_MODE>] [-q <SCHEDULER>] [-o <results.json>] [-s <seed>]')
+
+
+# ----------------------------------------------------------------------------------------
+def generate(initiators, procedures, targets):
+    """Returns the (global, fabric, initiators, targets) parameters of a synthetic testbench, out of include.py"""
+
+    global_params = deepcopy(inc.global_params)
+    global_params.update(DEBUG_LEVEL=0, DEBUG_COMPONENTS={}, DEBUG_RING_SIZE=0, TRACE_FILE=None)
+
+    initiator_template = inc.initiators_params[INITIATOR_TEMPLATE]
+    procedure_templates = list(initiator_template['PROCEDURES'].values())
+    queue_template = initiator_template['QUEUES'][procedure_templates[0]['QUEUE']]
+
+    initiators_params = {}
+    for i in range(initiators):
+        initiator = deepcopy(initiator_template)
+        initiator.update(PROCEDURES={}, TRACES={}, QUEUES={})
+
+        for p in range(procedures):
+            procedure = deepcopy(procedure_templates[p % len(procedure_templates)])
+            procedure['QUEUE'] = 'Q%d' % p
+            procedure.pop('DESTINATIONS', None)  # All the targets
+            initiator['PROCEDURES']['P%d' % p] = procedure
+            initiator['QUEUES']['Q%d' % p] = deepcopy(queue_template)
+
+        initiators_params['I%d' % i] = initiator
+
+    targets_params = {'T%d' % t: deepcopy(inc.targets_params[TARGET_TEMPLATE]) for t in range(targets)}
+
+    # A single fabric, with the template sockets and the template initiator-to-target latency:
+    fabric_params = {key: deepcopy(value) for key, value in inc.fabric_params.items() if key != 'SOCKETS'}
+    fabric_params['ARBITER'].update(WEIGHTS={}, PRIORITIES={}, SCHEDULE=[])
+
+    initiator_socket = inc.fabric_params['SOCKETS'][INITIATOR_TEMPLATE]
+    latency = initiator_socket['LATENCIES'].get(TARGET_TEMPLATE, 0)
+
+    fabric_params['SOCKETS'] = {}
+    for name in initiators_params:
+        fabric_params['SOCKETS'][name] = dict(deepcopy(initiator_socket), LATENCIES={t: latency for t in targets_params})
+    for name in targets_params:
+        fabric_params['SOCKETS'][name] = deepcopy(inc.fabric_params['SOCKETS'][TARGET_TEMPLATE])
+
+    return global_params, fabric_params, initiators_params, targets_params
+
+
+# ----------------------------------------------------------------------------------------
+def run_benchmark(task):
+    """Process-pool worker: builds and runs a single synthetic testbench, returns its measurements record"""
+
+    initiators, procedures, targets, sim_time_ns, mode, scheduler, seed = task
+
+    global_params, fabric_params, initiators_params, targets_params = generate(initiators, procedures, targets)
+    global_params.update(SIMULATION_TIME_IN_CYCLES=sim_time_ns, EXECUTION_MODE=mode, SCHEDULER=scheduler, SEED=seed)
+
+    env = environment(global_params)
+
+    start = time.perf_counter()
+    config, aux = configure(env, global_params, fabric_params, initiators_params, targets_params)
+    tb = build(env, aux, config)
+    built = time.perf_counter()
+    env.run(until=sim_time_ns)
+    done = time.perf_counter()
+
+    # Every scheduled event draws a sequence number (see simpy.Environment.schedule), hence no counting overhead:
+    events = next(env._eid) - len(env._queue)
+
+    run_wall_s = done - built
+
+    return {
+        'INITIATORS':        initiators,
+        'PROCEDURES':        procedures,
+        'TARGETS':           targets,
+        'MODE':              mode,
+        'SCHEDULER':         scheduler,
+        'SEED':              seed,
+        'SIM_TIME_NS':       sim_time_ns,
+        'BUILD_WALL_S':      built - start,
+        'RUN_WALL_S':        run_wall_s,
+        'EVENTS':            events,
+        'EVENTS_PER_S':      events / run_wall_s if run_wall_s else None,
+        'SIM_NS_PER_WALL_S': sim_time_ns / run_wall_s if run_wall_s else None,
+        'ACKS':              sum(initiator.acks for initiator in tb['INITIATORS'].values()),
+        'PEAK_RSS_KB':       peak_rss_kb()
+    }
+
+
+# ----------------------------------------------------------------------------------------
+def peak_rss_kb():
+
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return rss // 1024 if sys.platform == 'darwin' else rss  # Bytes on macOS, KB elsewhere
+
+
+# ----------------------------------------------------------------------------------------
+def main(argv):
+
+    initiators = [2, 8, 32, 128]
+    procedures = 2
+    targets = 4
+    sim_time_ns = 10000
+    mode = inc.global_params['EXECUTION_MODE']
+    scheduler = inc.global_params['SCHEDULER']
+    results_file = 'benchmark.json'
+    seed = 0
+
+    try:
+        opts, user_args = getopt.getopt(argv, "hn:p:m:t:e:q:o:s:")
+        for opt, user_arg in opts:
+            if opt == '-h':
+                usage()
+                sys.exit()
+            elif opt == '-n':
+                initiators = [int(n) for n in user_arg.split(',')]
+            elif opt == '-p':
+                procedures = int(user_arg)
+            elif opt == '-m':
+                targets = int(user_arg)
+            elif opt == '-t':
+                sim_time_ns = float(user_arg)
+            elif opt == '-e':
+                mode = user_arg
+            elif opt == '-q':
+                scheduler = user_arg
+            elif opt == '-o':
+                results_file = user_arg
+            elif opt == '-s':
+                seed = int(user_arg)
+
+    except (getopt.GetoptError, ValueError):
+        usage()
+        sys.exit(2)
+
+    tasks = [(n, procedures, targets, sim_time_ns, mode, scheduler, seed) for n in initiators]
+
+    results = {
+        'PLATFORM': platform.platform(),
+        'PYTHON':   platform.python_version(),
+        'SIMPY':    simpy.__version__,
+        'BENCHMARKS': []
+    }
+
+    # Benchmarks run one at a time (no interference), each in a fresh process (maxtasksperchild=1):
+    pool = Pool(1, maxtasksperchild=1)
+    try:
+        for record in pool.imap(run_benchmark, tasks):
+            print('[INFO] N=%-5d P=%-3d M=%-3d  %10d events  %10.0f events/s  %12.1f sim-ns/s  %8s KB peak RSS' % (
+                record['INITIATORS'], record['PROCEDURES'], record['TARGETS'], record['EVENTS'],
+                record['EVENTS_PER_S'] or 0, record['SIM_NS_PER_WALL_S'] or 0, record['PEAK_RSS_KB']))
+            results['BENCHMARKS'].append(record)
+    finally:
+        pool.close()
+        pool.join()
+
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print('[INFO] Results written to %s' % results_file)
+
+
+# ==================================================================================================================
+
+if __name__ == "__main__":
+
+    main(sys.argv[1:])
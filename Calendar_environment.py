@@ -0,0 +1,133 @@
+__author__ = 'shahargino'
+
+
+from heapq import heappush, heappop
+from collections import deque
+import simpy
+from simpy.core import EmptySchedule, StopSimulation, Infinity
+from simpy.events import NORMAL
+
+
+class Calendar(object):
+    """The pending events of a Calendar_environment: per time (edge), a deque of URGENT and a deque of NORMAL events"""
+
+    __slots__ = ('times', 'edges', 'urgent', 'normal', 'size')
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+
+        self.times = []     # Heap of the future edges
+        self.edges = {}     # {time: (urgent, normal)} of the future edges
+        self.urgent = deque()  # The current edge's URGENT events (and rescheduled ones, see Environment.step)
+        self.normal = deque()  # The current edge's NORMAL events
+        self.size = 0
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self):
+
+        return self.size
+
+
+class Calendar_environment(simpy.Environment):
+    """
+        This class implements a drop-in simpy.Environment, scheduling events by a calendar queue (SCHEDULER)
+
+        Notes:
+        ~~~~~~
+        (1) Clocked components schedule most of their events on the same clock edges, hence events are bucketed
+            by time: scheduling onto a pending edge and dispatching the next event of the current edge are O(1)
+            (deque append / popleft), the heap only holds the distinct future edges (O(log edges) per edge)
+        (2) Zero-delay events (Mailbox deliveries, triggered events, processes start) go straight to the current
+            edge's buckets, which are dispatched in a batch before the calendar advances to the next edge
+        (3) Dispatch order is SimPy's, i.e. by time, then priority, then scheduling order, hence runs are
+            identical to the default environment
+        (4) Times are used as keys as is (i.e. floating ns), events of a given edge share a bucket as long as their
+            times are computed alike (e.g. clock edges, see Clock_domains)
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, initial_time=0):
+
+        simpy.Environment.__init__(self, initial_time)
+
+        self._queue = Calendar()
+
+    # ----------------------------------------------------------------------------------------
+    def schedule(self, event, priority=NORMAL, delay=0):
+
+        calendar = self._queue
+
+        if delay:
+            time = self._now + delay
+            edge = calendar.edges.get(time)
+            if edge is None:
+                edge = calendar.edges[time] = (deque(), deque())
+                heappush(calendar.times, time)
+            urgent, normal = edge
+        else:
+            urgent, normal = calendar.urgent, calendar.normal
+
+        if priority == NORMAL:
+            normal.append(event)
+        elif priority < 0:
+            urgent.appendleft(event)  # Rescheduled events (see Environment.step) precede the URGENT ones
+        else:
+            urgent.append(event)
+
+        next(self._eid)  # Keeps counting the scheduled events
+        calendar.size += 1
+
+    # ----------------------------------------------------------------------------------------
+    def advance(self):
+        """Moves on to the next edge, returns False if there are no further events"""
+
+        calendar = self._queue
+        if not calendar.times:
+            return False
+
+        self._now = heappop(calendar.times)
+        calendar.urgent, calendar.normal = calendar.edges.pop(self._now)
+
+        return True
+
+    # ----------------------------------------------------------------------------------------
+    def peek(self):
+
+        calendar = self._queue
+        if calendar.urgent or calendar.normal:
+            return self._now
+
+        return calendar.times[0] if calendar.times else Infinity
+
+    # ----------------------------------------------------------------------------------------
+    def step(self):
+
+        calendar = self._queue
+
+        while not (calendar.urgent or calendar.normal):
+            if not self.advance():
+                raise EmptySchedule()
+
+        event = calendar.urgent.popleft() if calendar.urgent else calendar.normal.popleft()
+        calendar.size -= 1
+
+        # Same as simpy.Environment.step() from here on:
+        callbacks, event.callbacks = event.callbacks, None
+        try:
+            for callback in callbacks:
+                callback(event)
+        except StopSimulation:
+            event.callbacks = callbacks[callbacks.index(callback) + 1:]
+            self.schedule(event, -1)
+            raise
+
+        if not event._ok and not hasattr(event, '_defused'):
+            exc = type(event._value)(*event._value.args)
+            exc.__cause__ = event._value
+            raise exc
+
+
+ENVIRONMENTS = {
+    'HEAP':      simpy.Environment,
+    'CALENDAR':  Calendar_environment
+}
@@ -0,0 +1,73 @@
+__author__ = 'shahargino'
+
+
+from collections import deque
+from Messages import Bridge_crossing
+
+
+class Cdc_fifo(object):
+    """
+        This class implements a clock-domain-crossing FIFO, from a bridge socket to its peer fabric
+
+        Notes:
+        ~~~~~~
+        (1) An entry written on the bridge side becomes visible to the peer fabric after STAGES of its clock edges
+            (synchronizer), and at most a single entry is read per peer fabric's cycle
+        (2) An entry is freed once read. Writes to a full FIFO are held back, in order, until an entry is freed,
+            i.e. the bridge back-pressures rather than drops
+        (3) Each entry costs a single timeout event, there is no polling process
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, name, depth, stages, peer, peer_socket_id, tb):
+
+        self.name = self.__class__.__name__ + "_" + name
+        self.env = tb['ENV']
+        self.depth = depth
+        self.stages = stages
+        self.peer = peer
+        self.peer_socket_id = peer_socket_id
+        self.clk_ns = peer.clk_ns
+        self.fullness = 0
+        self.last_read_ns = None
+        self.held = deque()
+        self.written = 0
+        self.stalls = 0
+
+        self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
+
+    # ----------------------------------------------------------------------------------------
+    def write(self, message):
+
+        self.written += 1
+
+        if self.fullness < self.depth:
+            self.transfer(message)
+
+        else:
+            self.stalls += 1
+            self.held.append(message)
+            if self.debug_en:
+                self.debug(self.name, 'Full (%d entries), held messages: %d', self.depth, len(self.held))
+
+    # ----------------------------------------------------------------------------------------
+    def transfer(self, message):
+
+        self.fullness += 1
+
+        read_ns = self.peer.next_edge(self.env.now) + self.stages * self.clk_ns
+        if self.last_read_ns is not None and read_ns < self.last_read_ns + self.clk_ns:
+            read_ns = self.last_read_ns + self.clk_ns
+        self.last_read_ns = read_ns
+
+        self.env.timeout(read_ns - self.env.now, message).callbacks.append(self.read)
+
+    # ----------------------------------------------------------------------------------------
+    def read(self, event):
+
+        self.fullness -= 1
+        self.peer.inbox.put(Bridge_crossing(event.value, self.peer_socket_id))
+
+        if self.held:
+            self.transfer(self.held.popleft())
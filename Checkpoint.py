@@ -0,0 +1,144 @@
+__author__ = 'shahargino'
+
+
+import os
+import numpy as np
+from multiprocessing import get_context, cpu_count
+
+
+# Checkpointing a warmed-up simulation, to be continued as many what-if variants.
+#
+# Notes:
+# ~~~~~~
+# (1) SimPy processes are Python generators, which cannot be serialized, hence a simulation is checkpointed by
+#     forking its process (os.fork): every child continues from an identical copy of the whole simulation state,
+#     i.e. queues contents, outstanding counters, arbiter position, RNG states and pending events
+# (2) Continuations share the random streams states (common random numbers), hence variants differ by their
+#     parameters only
+# (3) A continuation may replace the arbiters and the targets parameters only (see reconfigure()), any other
+#     change requires its own warm-up
+# (4) snapshot() summarizes the checkpointed state, e.g. for verifying that continuations start out identical
+
+FORKED_TB = None  # The checkpointed testbench, inherited by the forked continuations (see fork())
+
+
+# ----------------------------------------------------------------------------------------
+def snapshot(tb):
+    """Returns the testbench's state (plain values), as inherited by its forked continuations"""
+
+    env = tb['ENV']
+
+    state = {
+        'TIME_NS': env.now,
+        'PENDING_EVENTS': len(env._queue),
+        'NEXT_EVENT_NS': env.peek(),
+        'RNG_STATES': {name: stream.bit_generator.state for name, stream in tb['RNG'].streams.items()},
+        'QUEUES': {},
+        'OUTSTANDING': {},
+        'ARBITERS': {}
+    }
+
+    for initiator in tb['INITIATORS'].values():
+        for queue in initiator.get_queues().values():
+            state['QUEUES'][queue.name] = [(request.src, request.dst, request.size) for request in queue.get_items()]
+
+        for procedure in initiator.procedures.values():
+            state['OUTSTANDING'][procedure.name] = procedure.outstanding
+
+    for fabric in tb['FABRICS'].values():
+        if fabric.arbiter is not None:
+            state['ARBITERS'][fabric.arbiter.name] = {
+                'GRANTED': fabric.arbiter.initiators[fabric.arbiter.granted],
+                'SLOT': fabric.arbiter.slot,
+                'READY': fabric.arbiter.ready
+            }
+
+    return state
+
+
+# ----------------------------------------------------------------------------------------
+def reset_measurements(tb):
+    """Discards the statistics collected so far (e.g. during warm-up), the simulation state is kept"""
+
+    for initiator in tb['INITIATORS'].values():
+        initiator.acks = 0
+        initiator.ack_bytes = 0
+
+        for queue in initiator.get_queues().values():
+            queue.enqueued = 0
+            queue.dequeued = 0
+            queue.overflows = 0
+
+    tb['STATS'].reset()
+    tb['MEASURE_START_NS'] = tb['ENV'].now
+
+
+# ----------------------------------------------------------------------------------------
+def unchanged(old, new):
+
+    return all(np.array_equal(a, b) if isinstance(a, np.ndarray) else a == b for a, b in zip(old, new))
+
+
+# ----------------------------------------------------------------------------------------
+def reconfigure(tb, config):
+    """Applies a compiled configuration (see Config.py) which differs by its arbiters and targets parameters only"""
+
+    error = tb['AUX'].error
+    current = tb['CONFIG']
+
+    if not unchanged(current.GLOBAL._replace(SIMULATION_TIME_IN_CYCLES=None),
+                     config.GLOBAL._replace(SIMULATION_TIME_IN_CYCLES=None)):
+        error(__name__, 'global_params may not change after a checkpoint (SIMULATION_TIME_IN_CYCLES excepted)')
+
+    if current.INITIATORS != config.INITIATORS or current.IDS != config.IDS:
+        error(__name__, 'initiators_params may not change after a checkpoint')
+
+    if len(current.FABRICS) != len(config.FABRICS):
+        error(__name__, 'fabric_params may not change after a checkpoint (ARBITER excepted)')
+
+    for old, new in zip(current.FABRICS, config.FABRICS):
+        if not unchanged(old._replace(ARBITER=None), new._replace(ARBITER=None)):
+            error(__name__, 'fabric_params may not change after a checkpoint (ARBITER excepted)')
+
+        fabric = tb['FABRICS'][new.NAME]
+        if new.ARBITER != old.ARBITER and fabric.arbiter is not None:
+            fabric.reconfigure_arbiter(new.ARBITER)
+
+    for old, new in zip(current.TARGETS, config.TARGETS):
+        if new != old:
+            tb['TARGETS'][new.NAME].reconfigure(new)
+
+    tb['CONFIG'] = config
+
+
+# ----------------------------------------------------------------------------------------
+def fork(tb, continue_run, tasks, processes=None):
+    """
+        Checkpoints the testbench and runs continue_run(tb, task) for every task, each in a forked copy of it,
+        returns the results in tasks order
+    """
+
+    global FORKED_TB
+
+    if not hasattr(os, 'fork'):
+        tb['AUX'].error(__name__, 'Checkpoints require os.fork (not available on %s)' % os.name)
+
+    FORKED_TB = tb
+
+    # A fresh fork per task (maxtasksperchild=1), the parent process is left at the checkpoint:
+    pool = get_context('fork').Pool(processes or cpu_count(), maxtasksperchild=1)
+    try:
+        return list(pool.imap(run_forked, [(continue_run, task) for task in tasks]))
+    finally:
+        pool.close()
+        pool.join()
+        FORKED_TB = None
+
+
+# ----------------------------------------------------------------------------------------
+def run_forked(task):
+    """Process-pool worker: continues the inherited (checkpointed) testbench"""
+
+    continue_run, task = task
+
+    return continue_run(FORKED_TB, task)
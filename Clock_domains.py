@@ -0,0 +1,138 @@
+__author__ = 'shahargino'
+
+
+from bisect import bisect_left
+
+
+PS_PER_NS = 1000
+
+
+class Clock_domain(object):
+    """
+        This class implements a clock domain, i.e. the edges of a single clock, shared by all of its components
+
+        Notes:
+        ~~~~~~
+        (1) The period is an integer number of picoseconds, and edge #k is at exactly k x period: edge times are
+            computed out of the integer cycle number rather than accumulated, hence they never drift
+        (2) The components of a domain subscribe to its edges (see next_edge()), i.e. a single event is scheduled
+            per domain per edge, rather than a timer per component
+        (3) Simulation time is kept in ns, it is converted to integer picoseconds (rounded) for edge computations
+        (4) TICKED mode: components attach a tick() callback, and a single driver process calls the active ones,
+            in attachment order, on every edge. A component deactivates itself while idle, (de)activations take
+            effect from the next edge on, and the driver stops while no component is active.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, env, period_ps):
+
+        self.name = self.__class__.__name__ + "_%dps" % period_ps
+        self.env = env
+        self.period_ps = period_ps
+        self.period_ns = period_ps / PS_PER_NS
+        self.edge = None
+        self.cycle = -1
+
+        # TICKED mode, the active ticks (sorted by attachment order) are replaced rather than modified in place,
+        # hence the driver may iterate them while ticks (de)activate components:
+        self.ranks = {}
+        self.active_ranks = []
+        self.ticks = []
+        self.driver = None
+
+    # ----------------------------------------------------------------------------------------
+    def get_cycle(self, time_ns):
+        """Returns the number of the last edge at (or before) the given time"""
+
+        return int(round(time_ns * PS_PER_NS)) // self.period_ps
+
+    # ----------------------------------------------------------------------------------------
+    def cycle_time(self, cycle):
+        """Returns the time of the given edge"""
+
+        return cycle * self.period_ps / PS_PER_NS
+
+    # ----------------------------------------------------------------------------------------
+    def edge_time(self, time_ns):
+        """Returns the time of the first edge at (or after) the given time"""
+
+        return -(-int(round(time_ns * PS_PER_NS)) // self.period_ps) * self.period_ps / PS_PER_NS
+
+    # ----------------------------------------------------------------------------------------
+    def on_edge(self):
+
+        return int(round(self.env.now * PS_PER_NS)) % self.period_ps == 0
+
+    # ----------------------------------------------------------------------------------------
+    def next_edge(self):
+        """Returns the (shared) event of the first edge after the current time"""
+
+        cycle = self.get_cycle(self.env.now) + 1
+        if cycle != self.cycle:
+            self.cycle = cycle
+            self.edge = self.env.timeout(self.cycle_time(cycle) - self.env.now, cycle)
+
+        return self.edge
+
+    # ----------------------------------------------------------------------------------------
+    def attach(self, tick, active=True):
+        """Attaches a component's tick() callback to the domain's driver (TICKED mode)"""
+
+        self.ranks[tick] = len(self.ranks)
+
+        if active:
+            self.activate(tick)
+
+    # ----------------------------------------------------------------------------------------
+    def activate(self, tick):
+
+        rank = self.ranks[tick]
+        index = bisect_left(self.active_ranks, rank)
+
+        if index == len(self.active_ranks) or self.active_ranks[index] != rank:
+            self.active_ranks = self.active_ranks[:index] + [rank] + self.active_ranks[index:]
+            self.ticks = self.ticks[:index] + [tick] + self.ticks[index:]
+
+            if self.driver is None:
+                self.driver = self.env.process(self.run())
+
+    # ----------------------------------------------------------------------------------------
+    def deactivate(self, tick):
+
+        rank = self.ranks[tick]
+        index = bisect_left(self.active_ranks, rank)
+
+        if index < len(self.active_ranks) and self.active_ranks[index] == rank:
+            self.active_ranks = self.active_ranks[:index] + self.active_ranks[index + 1:]
+            self.ticks = self.ticks[:index] + self.ticks[index + 1:]
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+
+        while self.ticks:
+
+            yield self.next_edge()
+
+            for tick in self.ticks:
+                tick()
+
+        self.driver = None
+
+
+class Clock_domains(object):
+    """This class implements the clock domains manager, a single Clock_domain per distinct clock period"""
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, env):
+
+        self.env = env
+        self.domains = {}
+
+    # ----------------------------------------------------------------------------------------
+    def get(self, period_ps):
+
+        domain = self.domains.get(period_ps)
+        if domain is None:
+            domain = self.domains[period_ps] = Clock_domain(self.env, period_ps)
+
+        return domain
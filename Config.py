@@ -0,0 +1,491 @@
+__author__ = 'shahargino'
+
+
+from numbers import Integral, Real
+from collections import namedtuple, deque
+from types import MappingProxyType
+import numpy as np
+from Arbiter_policies import POLICIES
+from Calendar_environment import ENVIRONMENTS
+from Clock_domains import PS_PER_NS
+
+
+# Configuration compilation: include.py's dictionaries are validated once, at startup, and frozen into
+# namedtuples (attribute access, no string-keyed lookups in the run loops), along with their integer IDs
+# and derived values (clock periods, queue quotas, socket-to-socket latency matrix, etc.)
+#
+# Notes:
+# (1) Field names are kept identical to include.py's keys, e.g. params['OUTSTANDING'] --> params.OUTSTANDING
+# (2) Sub-dictionaries of named entities (SOCKETS, PROCEDURES, QUEUES, etc.) are compiled into tuples,
+#     ordered as in include.py, each entity carrying its NAME and ID
+# (3) Unknown keys are rejected (typos), optional keys get their default value
+# (4) fabric_params is either a single fabric (named DATA) or a {name: fabric} dictionary of fabrics connected by
+#     bridge sockets, in which case every fabric gets next-hop routing tables (see compile_topology())
+# (5) Clock periods are rounded to integer picoseconds (CLK_PS), CLK_NS is derived from CLK_PS (see Clock_domains.py)
+
+Global_config = namedtuple('Global_config', ['DEBUG_LEVEL', 'DEBUG_COMPONENTS', 'DEBUG_RING_SIZE', 'TRACE_FILE',
+                                             'TRACE_CHUNK', 'TRANSACTION_POOL', 'SEED', 'PROFILE', 'PROFILE_FILE',
+                                             'EXECUTION_MODE', 'SCHEDULER', 'STEADY_STATE', 'STEADY_STATE_INTERVAL',
+                                             'STEADY_STATE_BATCHES', 'STEADY_STATE_CONFIDENCE',
+                                             'STEADY_STATE_PRECISION', 'SIMULATION_TIME_IN_CYCLES'])
+
+Arbiter_config = namedtuple('Arbiter_config', ['POLICY', 'SLOT_LENGTH', 'START_AT', 'WORK_CONSERVING', 'WEIGHTS',
+                                               'PRIORITIES', 'SCHEDULE'])
+
+Socket_config = namedtuple('Socket_config', ['NAME', 'ID', 'PROTOCOL', 'RD_WR_CH', 'INIT_TGT', 'LATENCIES', 'PEER',
+                                             'CDC_DEPTH', 'CDC_STAGES', 'IS_INITIATOR', 'IS_BRIDGE', 'PEER_SOCKET'])
+
+Fabric_config = namedtuple('Fabric_config', ['NAME', 'ID', 'FREQUENCY_MHZ', 'ARBITER', 'SOCKETS', 'CLK_PS',
+                                             'CLK_NS', 'SOCKET_IDS', 'LATENCY_CYCLES', 'LATENCY_NS', 'INITIATORS', 'TARGETS',
+                                             'ROUTE_BY_INITIATOR_ID', 'ROUTE_BY_TARGET_ID'])
+
+Bus_config = namedtuple('Bus_config', ['PROTOCOL', 'WR_EN', 'WR_LATENCY', 'RD_EN', 'RD_LATENCY'])
+
+Procedure_config = namedtuple('Procedure_config', ['NAME', 'INITIATOR', 'DIRECTION', 'BURST_LENGTH', 'BURST_SIZE',
+                                                   'INTER_BURSTS', 'THR_IN_MBPS', 'OUTSTANDING', 'ADDRESS_GEN',
+                                                   'BUS_WIDTH', 'QUEUE', 'BATCH_BURSTS', 'DESTINATIONS',
+                                                   'INITIATOR_ID', 'QUEUE_ID', 'DESTINATION_IDS'])
+
+Trace_config = namedtuple('Trace_config', ['NAME', 'INITIATOR', 'FILE', 'TARGETS', 'OUTSTANDING', 'CHUNK', 'QUEUE',
+                                           'INITIATOR_ID', 'QUEUE_ID', 'TARGET_IDS'])
+
+Queue_config = namedtuple('Queue_config', ['NAME', 'ID', 'DEPTH', 'WIDTH', 'QUOTA'])
+
+Initiator_config = namedtuple('Initiator_config', ['NAME', 'ID', 'FREQUENCY_MHZ', 'BUS', 'PROCEDURES', 'TRACES',
+                                                   'QUEUES', 'CLK_PS', 'CLK_NS'])
+
+Target_config = namedtuple('Target_config', ['NAME', 'ID', 'FREQUENCY_MHZ', 'BUS', 'PENALTIES', 'CLK_PS',
+                                             'CLK_NS'])
+
+Config = namedtuple('Config', ['GLOBAL', 'FABRICS', 'INITIATORS', 'TARGETS', 'IDS'])
+
+
+# ----------------------------------------------------------------------------------------
+# Value checks, each returns None when valid or else the expected value description:
+
+def integer(minimum=0):
+    return lambda value: None if isinstance(value, Integral) and not isinstance(value, bool) and value >= minimum \
+        else 'an integer >= %d' % minimum
+
+
+def positive(value):
+    return None if isinstance(value, Real) and not isinstance(value, bool) and value > 0 else 'a positive number'
+
+
+def fraction(value):
+    return None if positive(value) is None and value < 1 else 'a number between 0 and 1'
+
+
+def boolean(value):
+    return None if isinstance(value, bool) or value in (0, 1) else 'True / False'
+
+
+def string(value):
+    return None if isinstance(value, str) else 'a string'
+
+
+def optional_string(value):
+    return None if value is None or isinstance(value, str) else 'a string or None'
+
+
+def optional_integer(value):
+    return None if value is None or integer(0)(value) is None else 'an integer >= 0 or None'
+
+
+def one_of(*choices):
+    return lambda value: None if value in choices else ' / '.join(choices)
+
+
+def names(value):
+    return None if isinstance(value, (list, tuple)) and all(isinstance(name, str) for name in value) \
+        else 'a list of names'
+
+
+def table(check, expected):
+    return lambda value: None if isinstance(value, dict) and all(check(item) is None for item in value.values()) \
+        else expected
+
+
+def channels(value):
+    return None if isinstance(value, (list, tuple)) and len(value) == 2 and \
+        one_of('read', 'write', 'both')(value[0]) is None and integer(1)(value[1]) is None \
+        else "a (read / write / both, width) pair, e.g. ('both', 64)"
+
+
+def mapping(value):
+    return None if isinstance(value, dict) else 'a dictionary'
+
+
+def section(value):
+    return mapping(value)   # Same as mapping, yet compiled further rather than frozen as is
+
+
+REQUIRED = object()
+
+# Fields specifications: (key, default value or REQUIRED, check)
+GLOBAL_FIELDS = (
+    ('DEBUG_LEVEL',                0,                 integer(0)),
+    ('DEBUG_COMPONENTS',           {},                table(integer(0), 'a {name prefix: level} dictionary')),
+    ('DEBUG_RING_SIZE',            0,                 integer(0)),
+    ('TRACE_FILE',                 None,              optional_string),
+    ('TRACE_CHUNK',                65536,             integer(1)),
+    ('TRANSACTION_POOL',           False,             boolean),
+    ('SEED',                       None,              optional_integer),
+    ('PROFILE',                    False,             boolean),
+    ('PROFILE_FILE',               None,              optional_string),
+    ('EXECUTION_MODE',             'CYCLE_ACCURATE',  one_of('CYCLE_ACCURATE', 'TICKED', 'EVENT_DRIVEN')),
+    ('SCHEDULER',                  'HEAP',            one_of(*ENVIRONMENTS)),
+    ('STEADY_STATE',               False,             boolean),
+    ('STEADY_STATE_INTERVAL',      100,               positive),
+    ('STEADY_STATE_BATCHES',       20,                integer(5)),
+    ('STEADY_STATE_CONFIDENCE',    0.95,              fraction),
+    ('STEADY_STATE_PRECISION',     0.05,              fraction),
+    ('SIMULATION_TIME_IN_CYCLES',  REQUIRED,          positive)
+)
+
+FABRIC_FIELDS = (
+    ('FREQUENCY_MHZ',  REQUIRED,  positive),
+    ('ARBITER',        REQUIRED,  section),
+    ('SOCKETS',        REQUIRED,  section)
+)
+
+ARBITER_FIELDS = (
+    ('POLICY',           'ROUND_ROBIN',  one_of(*POLICIES)),
+    ('SLOT_LENGTH',      REQUIRED,       integer(1)),
+    ('START_AT',         'FIRST',        one_of('FIRST', 'RANDOM')),
+    ('WORK_CONSERVING',  False,          boolean),
+    ('WEIGHTS',          {},             table(integer(1), 'an {initiator: weight} dictionary')),
+    ('PRIORITIES',       {},             table(integer(0), 'an {initiator: priority} dictionary')),
+    ('SCHEDULE',         (),             names)
+)
+
+SOCKET_FIELDS = (
+    ('PROTOCOL',    REQUIRED,  string),
+    ('RD_WR_CH',    REQUIRED,  channels),
+    ('INIT_TGT',    REQUIRED,  one_of('initiator', 'target', 'bridge')),
+    ('LATENCIES',   {},        table(integer(0), 'a {socket: cycles} dictionary')),
+    ('PEER',        None,      optional_string),    # Bridges only: the fabric on the other side
+    ('CDC_DEPTH',   4,         integer(1)),         # Bridges only: clock-domain-crossing FIFO entries
+    ('CDC_STAGES',  2,         integer(0))          # Bridges only: synchronizer stages, in peer fabric's cycles
+)
+
+BUS_FIELDS = (
+    ('PROTOCOL',    REQUIRED,  string),
+    ('WR_EN',       REQUIRED,  boolean),
+    ('WR_LATENCY',  0,         integer(0)),
+    ('RD_EN',       REQUIRED,  boolean),
+    ('RD_LATENCY',  0,         integer(0))
+)
+
+INITIATOR_FIELDS = (
+    ('FREQUENCY_MHZ',  REQUIRED,  positive),
+    ('BUS',            REQUIRED,  section),
+    ('PROCEDURES',     {},        section),
+    ('TRACES',         {},        section),
+    ('QUEUES',         REQUIRED,  section)
+)
+
+PROCEDURE_FIELDS = (
+    ('DIRECTION',     REQUIRED,  one_of('read', 'write')),
+    ('BURST_LENGTH',  REQUIRED,  integer(1)),
+    ('BURST_SIZE',    REQUIRED,  integer(1)),
+    ('INTER_BURSTS',  REQUIRED,  integer(0)),
+    ('THR_IN_MBPS',   REQUIRED,  positive),
+    ('OUTSTANDING',   REQUIRED,  integer(1)),
+    ('ADDRESS_GEN',   REQUIRED,  one_of('random', 'raster')),
+    ('BUS_WIDTH',     REQUIRED,  integer(1)),
+    ('QUEUE',         REQUIRED,  string),
+    ('BATCH_BURSTS',  0,         integer(0)),
+    ('DESTINATIONS',  None,      names)         # None = all the targets
+)
+
+TRACE_FIELDS = (
+    ('FILE',         REQUIRED,  string),
+    ('TARGETS',      REQUIRED,  names),
+    ('OUTSTANDING',  REQUIRED,  integer(1)),
+    ('CHUNK',        65536,     integer(1)),
+    ('QUEUE',        REQUIRED,  string)
+)
+
+QUEUE_FIELDS = (
+    ('DEPTH',  REQUIRED,  integer(1)),
+    ('WIDTH',  REQUIRED,  integer(1))
+)
+
+TARGET_FIELDS = (
+    ('FREQUENCY_MHZ',  REQUIRED,  positive),
+    ('BUS',            REQUIRED,  section),
+    ('PENALTIES',      {},        mapping)
+)
+
+
+# ----------------------------------------------------------------------------------------
+def compile_fields(path, params, fields, error):
+    """Validates a dictionary against its fields specification, returns the values (defaults included)"""
+
+    if not isinstance(params, dict):
+        error(__name__, '%s: expected a dictionary, got %r' % (path, params))
+
+    known = [key for key, default, check in fields]
+    for key in params:
+        if key not in known:
+            error(__name__, '%s: unknown key "%s" (expected one of %s)' % (path, key, ', '.join(known)))
+
+    values = {}
+    for key, default, check in fields:
+
+        value = params.get(key, default)
+
+        if key not in params:
+            if default is REQUIRED:
+                error(__name__, '%s: missing key "%s"' % (path, key))
+
+        elif check(value) is not None:
+            error(__name__, '%s.%s: expected %s, got %r' % (path, key, check(value), value))
+
+        if check is not section:
+            value = MappingProxyType(dict(value)) if isinstance(value, dict) else \
+                tuple(value) if isinstance(value, list) else value
+
+        values[key] = value
+
+    return values
+
+
+# ----------------------------------------------------------------------------------------
+def clock_period_ps(frequency_mhz):
+
+    return max(1, int(round(1000 * PS_PER_NS / frequency_mhz)))
+
+
+# ----------------------------------------------------------------------------------------
+def lookup(path, name, ids, kind, error):
+    """Returns the ID of a named entity, reports an error upon an unknown name"""
+
+    if name not in ids:
+        error(__name__, '%s: unknown %s "%s" (expected one of %s)' % (path, kind, name, ', '.join(ids)))
+
+    return ids[name]
+
+
+# ----------------------------------------------------------------------------------------
+def compile_fabric(name, index, path, params, initiators_params, targets_params, error):
+
+    values = compile_fields(path, params, FABRIC_FIELDS, error)
+    values['ARBITER'] = Arbiter_config(**compile_fields(path + '.ARBITER', values['ARBITER'], ARBITER_FIELDS, error))
+
+    socket_ids = {socket_name: socket_id for socket_id, socket_name in enumerate(values['SOCKETS'])}
+
+    sockets = []
+    for socket_name, socket_params in values['SOCKETS'].items():
+        socket_path = path + '.SOCKETS.' + socket_name
+        socket = compile_fields(socket_path, socket_params, SOCKET_FIELDS, error)
+
+        if socket['INIT_TGT'] == 'bridge':
+            if socket['PEER'] is None:
+                error(__name__, '%s: missing key "PEER" (bridge socket)' % socket_path)
+
+        elif socket['PEER'] is not None:
+            error(__name__, '%s.PEER: only bridge sockets have a peer fabric' % socket_path)
+
+        elif socket_name not in (initiators_params if socket['INIT_TGT'] == 'initiator' else targets_params):
+            error(__name__, '%s: no %s named "%s"' % (socket_path, socket['INIT_TGT'], socket_name))
+
+        for destination in socket['LATENCIES']:
+            lookup(socket_path + '.LATENCIES', destination, socket_ids, 'socket', error)
+
+        sockets.append(Socket_config(NAME=socket_name, ID=socket_ids[socket_name],
+                                     IS_INITIATOR=socket['INIT_TGT'] == 'initiator',
+                                     IS_BRIDGE=socket['INIT_TGT'] == 'bridge', PEER_SOCKET=None, **socket))
+
+    initiators = tuple(socket.NAME for socket in sockets if socket.INIT_TGT == 'initiator')
+    initiator_ids = {socket.NAME: socket.ID for socket in sockets if socket.INIT_TGT == 'initiator'}
+    for key in ('WEIGHTS', 'PRIORITIES', 'SCHEDULE'):
+        for initiator_name in getattr(values['ARBITER'], key):
+            lookup(path + '.ARBITER.' + key, initiator_name, initiator_ids, 'initiator socket', error)
+
+    # Socket-to-socket latencies, in fabric's cycles, indexed by (source socket ID, destination socket ID):
+    latency_cycles = np.zeros((len(sockets), len(sockets)), dtype=np.int64)
+    for socket in sockets:
+        for destination, cycles in socket.LATENCIES.items():
+            latency_cycles[socket.ID, socket_ids[destination]] = cycles
+
+    clk_ps = clock_period_ps(values['FREQUENCY_MHZ'])
+    latency_ns = latency_cycles * (clk_ps / PS_PER_NS)
+    latency_cycles.flags.writeable = False
+    latency_ns.flags.writeable = False
+
+    values['SOCKETS'] = tuple(sockets)
+
+    return Fabric_config(NAME=name, ID=index, CLK_PS=clk_ps, CLK_NS=clk_ps / PS_PER_NS, SOCKET_IDS=MappingProxyType(socket_ids),
+                         LATENCY_CYCLES=latency_cycles, LATENCY_NS=latency_ns, INITIATORS=initiators,
+                         TARGETS=tuple(socket.NAME for socket in sockets if socket.INIT_TGT == 'target'),
+                         ROUTE_BY_INITIATOR_ID=None, ROUTE_BY_TARGET_ID=None, **values)
+
+
+# ----------------------------------------------------------------------------------------
+def compile_topology(fabrics, ids, error):
+    """
+        Connects the fabrics' bridge sockets and computes every fabric's next-hop routing tables, i.e. the socket
+        ID to forward a request (by its target ID) or an ACK (by its initiator ID) to, along the shortest path
+    """
+
+    homes = {}
+    for fabric in fabrics:
+        for name in fabric.INITIATORS + fabric.TARGETS:
+            if name in homes:
+                error(__name__, 'fabric_params: "%s" is connected to both %s and %s' % (name, homes[name], fabric.NAME))
+            homes[name] = fabric.NAME
+
+    for name in list(ids['INITIATORS']) + list(ids['TARGETS']):
+        if name not in homes:
+            error(__name__, 'fabric_params: missing a socket for "%s"' % name)
+
+    # Bridges, as {fabric: {peer fabric: bridge socket}}:
+    fabrics_by_name = {fabric.NAME: fabric for fabric in fabrics}
+    bridges = {fabric.NAME: {} for fabric in fabrics}
+    for fabric in fabrics:
+        for socket in fabric.SOCKETS:
+            if socket.IS_BRIDGE:
+                path = 'fabric_params.%s.SOCKETS.%s.PEER' % (fabric.NAME, socket.NAME)
+                lookup(path, socket.PEER, fabrics_by_name, 'fabric', error)
+                if socket.PEER == fabric.NAME or socket.PEER in bridges[fabric.NAME]:
+                    error(__name__, '%s: a single bridge is expected between two distinct fabrics' % path)
+                bridges[fabric.NAME][socket.PEER] = socket
+
+    compiled = []
+    for fabric in fabrics:
+
+        sockets = list(fabric.SOCKETS)
+        for peer, socket in bridges[fabric.NAME].items():
+            if fabric.NAME not in bridges[peer]:
+                error(__name__, 'fabric_params.%s: missing a bridge socket back to "%s"' % (peer, fabric.NAME))
+            sockets[socket.ID] = socket._replace(PEER_SOCKET=bridges[peer][fabric.NAME].NAME)
+
+        # Breadth-first search, every reachable fabric inherits the first hop (bridge) of the path leading to it:
+        first_hop = {fabric.NAME: None}
+        frontier = deque([fabric.NAME])
+        while frontier:
+            current = frontier.popleft()
+            for peer, socket in bridges[current].items():
+                if peer not in first_hop:
+                    first_hop[peer] = first_hop[current] if current != fabric.NAME else socket.ID
+                    frontier.append(peer)
+
+        for peer in fabrics_by_name:
+            if peer not in first_hop:
+                error(__name__, 'fabric_params: fabric "%s" has no path to fabric "%s"' % (fabric.NAME, peer))
+
+        def route(name):
+            return fabric.SOCKET_IDS[name] if homes[name] == fabric.NAME else first_hop[homes[name]]
+
+        compiled.append(fabric._replace(SOCKETS=tuple(sockets),
+                                        ROUTE_BY_INITIATOR_ID=tuple(route(name) for name in ids['INITIATORS']),
+                                        ROUTE_BY_TARGET_ID=tuple(route(name) for name in ids['TARGETS'])))
+
+    return tuple(compiled)
+
+
+# ----------------------------------------------------------------------------------------
+def compile_initiator(name, params, ids, error):
+
+    path = 'initiators_params.' + name
+    values = compile_fields(path, params, INITIATOR_FIELDS, error)
+    values['BUS'] = Bus_config(**compile_fields(path + '.BUS', values['BUS'], BUS_FIELDS, error))
+
+    queues = []
+    for queue_name, queue_params in values['QUEUES'].items():
+        queue = compile_fields(path + '.QUEUES.' + queue_name, queue_params, QUEUE_FIELDS, error)
+        queues.append(Queue_config(NAME=queue_name, ID=ids['QUEUES'][name + '_' + queue_name],
+                                   QUOTA=queue['DEPTH'] * queue['WIDTH'], **queue))
+
+    values['QUEUES'] = tuple(queues)
+    queue_ids = {queue.NAME: queue.ID for queue in values['QUEUES']}
+
+    procedures = []
+    for procedure_name, procedure_params in values['PROCEDURES'].items():
+        procedure_path = path + '.PROCEDURES.' + procedure_name
+        procedure = compile_fields(procedure_path, procedure_params, PROCEDURE_FIELDS, error)
+
+        if procedure['DESTINATIONS'] is None:
+            procedure['DESTINATIONS'] = tuple(ids['TARGETS'])
+        elif not procedure['DESTINATIONS']:
+            error(__name__, '%s.DESTINATIONS: expected at least one target' % procedure_path)
+
+        procedures.append(Procedure_config(
+            NAME=procedure_name, INITIATOR=name, INITIATOR_ID=ids['INITIATORS'][name],
+            QUEUE_ID=lookup(procedure_path + '.QUEUE', procedure['QUEUE'], queue_ids, 'queue', error),
+            DESTINATION_IDS=tuple(lookup(procedure_path + '.DESTINATIONS', target, ids['TARGETS'], 'target', error)
+                                  for target in procedure['DESTINATIONS']),
+            **procedure))
+
+    traces = []
+    for trace_name, trace_params in values['TRACES'].items():
+        trace_path = path + '.TRACES.' + trace_name
+        trace = compile_fields(trace_path, trace_params, TRACE_FIELDS, error)
+
+        if trace_name in values['PROCEDURES']:
+            error(__name__, '%s: name already used by a procedure' % trace_path)
+
+        traces.append(Trace_config(
+            NAME=trace_name, INITIATOR=name, INITIATOR_ID=ids['INITIATORS'][name],
+            QUEUE_ID=lookup(trace_path + '.QUEUE', trace['QUEUE'], queue_ids, 'queue', error),
+            TARGET_IDS=tuple(lookup(trace_path + '.TARGETS', target, ids['TARGETS'], 'target', error)
+                             for target in trace['TARGETS']),
+            **trace))
+
+    values['PROCEDURES'] = tuple(procedures)
+    values['TRACES'] = tuple(traces)
+
+    clk_ps = clock_period_ps(values['FREQUENCY_MHZ'])
+
+    return Initiator_config(NAME=name, ID=ids['INITIATORS'][name], CLK_PS=clk_ps, CLK_NS=clk_ps / PS_PER_NS, **values)
+
+
+# ----------------------------------------------------------------------------------------
+def compile_target(name, params, ids, error):
+
+    path = 'targets_params.' + name
+    values = compile_fields(path, params, TARGET_FIELDS, error)
+    values['BUS'] = Bus_config(**compile_fields(path + '.BUS', values['BUS'], BUS_FIELDS, error))
+
+    clk_ps = clock_period_ps(values['FREQUENCY_MHZ'])
+
+    return Target_config(NAME=name, ID=ids['TARGETS'][name], CLK_PS=clk_ps, CLK_NS=clk_ps / PS_PER_NS, **values)
+
+
+# ----------------------------------------------------------------------------------------
+def compile_config(global_params, fabric_params, initiators_params, targets_params, error):
+    """Validates include.py's dictionaries and compiles them into a (frozen) Config, errors are reported through error()"""
+
+    for path, params in (('initiators_params', initiators_params), ('targets_params', targets_params)):
+        if section(params) is not None or not params:
+            error(__name__, '%s: expected a non-empty dictionary' % path)
+
+    # Integer IDs, carried by the transactions instead of names:
+    ids = {
+        'INITIATORS': {name: index for index, name in enumerate(initiators_params)},
+        'QUEUES':     {name: index for index, name in enumerate(
+            initiator_name + '_' + queue_name
+            for initiator_name, initiator_params in initiators_params.items()
+            for queue_name in initiator_params.get('QUEUES', {}))},
+        'TARGETS':    {name: index for index, name in enumerate(targets_params)}
+    }
+
+    # A single fabric, or a {name: fabric} dictionary of bridged fabrics:
+    if section(fabric_params) is not None or not fabric_params:
+        error(__name__, 'fabric_params: expected a non-empty dictionary')
+
+    if 'SOCKETS' in fabric_params:
+        fabrics = [compile_fabric('DATA', 0, 'fabric_params', fabric_params, initiators_params, targets_params, error)]
+    else:
+        fabrics = [compile_fabric(name, index, 'fabric_params.' + name, params, initiators_params, targets_params,
+                                  error) for index, (name, params) in enumerate(fabric_params.items())]
+
+    return Config(
+        GLOBAL=Global_config(**compile_fields('global_params', global_params, GLOBAL_FIELDS, error)),
+        FABRICS=compile_topology(fabrics, ids, error),
+        INITIATORS=tuple(compile_initiator(name, params, ids, error) for name, params in initiators_params.items()),
+        TARGETS=tuple(compile_target(name, params, ids, error) for name, params in targets_params.items()),
+        IDS=MappingProxyType({kind: MappingProxyType(kind_ids) for kind, kind_ids in ids.items()})
+    )
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#  ___           _          _
+# | __|__ _ _  _(_)_ ____ _| |___ _ _  __ ___
+# | _|/ _` | || | \ V / _` | / -_) ' \/ _/ -_)
+# |___\__, |\_,_|_|\_/\__,_|_\___|_||_\__\___|
+#        |_|
+#
+# Checks that execution modes agree, transaction by transaction: the include.py testbench is run once per
+# EXECUTION_MODE (same seed), every transaction is recorded (see Trace_recorder.py), and the per-transaction
+# delays (dequeue, target, ACK) of each mode are compared against the first (reference) mode.
+#
+# Transactions are matched by (initiator, queue, enqueue time). The exit status is 1 if any transaction is missing,
+# extra or has different delays in any mode.
+#
+# Overrides (-p) are dotted paths into include.py's dictionaries, with JSON values, as in Sweep.py, e.g. sparse traffic:
+#
+#     Equivalence.py -m CYCLE_ACCURATE,TICKED,EVENT_DRIVEN -t 20000 -s 3 \
+#                    -p 'initiators_params.*.PROCEDURES.*.THR_IN_MBPS=10' \
+#                    -p 'initiators_params.*.PROCEDURES.*.INTER_BURSTS=2000' \
+#                    -p 'initiators_params.*.PROCEDURES.*.BURST_LENGTH=2'
+
+import os
+import sys
+import json
+import getopt
+import shutil
+import tempfile
+
+from main import simulate
+from Sweep import base_params, apply_override
+from Trace_recorder import Trace_recorder
+
+
+MODES = ('CYCLE_ACCURATE', 'TICKED', 'EVENT_DRIVEN')
+
+
+# ----------------------------------------------------------------------------------------
+def usage():
+    print('Equivalence.py [-m <mode,mode,...>] [-t <simulation_time_ns>] [-s <seed>] [-p <path=json_value>]...')
+
+
+# ----------------------------------------------------------------------------------------
+def run_mode(mode, overrides, seed, trace_file):
+    """Runs the testbench in the given execution mode, returns its transactions {(initiator, queue, t_enqueue): record}"""
+
+    params = base_params(seed)
+
+    for path, value in overrides:
+        apply_override(params, path, value)
+
+    params['global_params'].update(EXECUTION_MODE=mode, TRACE_FILE=trace_file)
+
+    simulate(**params)
+
+    records, _ = Trace_recorder.load(trace_file)
+
+    return {(record[0], record[1], record[5]): record for record in records.tolist()}
+
+
+# ----------------------------------------------------------------------------------------
+def compare(reference, transactions):
+    """Returns the keys of the missing, extra and mismatching (target, size or delays) transactions"""
+
+    missing = sorted(set(reference) - set(transactions))
+    extra = sorted(set(transactions) - set(reference))
+    mismatching = sorted(key for key in set(reference) & set(transactions) if reference[key] != transactions[key])
+
+    return missing, extra, mismatching
+
+
+# ----------------------------------------------------------------------------------------
+def check(modes, overrides, seed=0):
+    """Runs all the modes and compares them against the first one, returns True if they all agree"""
+
+    trace_dir = tempfile.mkdtemp()
+    try:
+        results = [run_mode(mode, overrides, seed, os.path.join(trace_dir, mode + '.npy')) for mode in modes]
+    finally:
+        shutil.rmtree(trace_dir)
+
+    reference = results[0]
+    agree = True
+
+    for mode, transactions in zip(modes[1:], results[1:]):
+
+        missing, extra, mismatching = compare(reference, transactions)
+
+        print('[INFO] %s vs. %s: %d vs. %d transactions, %d missing, %d extra, %d mismatching' % (
+            modes[0], mode, len(reference), len(transactions), len(missing), len(extra), len(mismatching)))
+
+        for key in mismatching[:5]:
+            print('[INFO]   %s: %s vs. %s' % (key, reference[key][6:], transactions[key][6:]))
+
+        agree = agree and not (missing or extra or mismatching)
+
+    return agree
+
+
+# ----------------------------------------------------------------------------------------
+def main(argv):
+
+    modes = MODES
+    overrides = []
+    seed = 0
+
+    try:
+        opts, user_args = getopt.getopt(argv, "hm:t:s:p:")
+        for opt, user_arg in opts:
+            if opt == '-h':
+                usage()
+                sys.exit()
+            elif opt == '-m':
+                modes = user_arg.split(',')
+            elif opt == '-t':
+                overrides.append(('global_params.SIMULATION_TIME_IN_CYCLES', float(user_arg)))
+            elif opt == '-s':
+                seed = int(user_arg)
+            elif opt == '-p':
+                path, value = user_arg.split('=', 1)
+                overrides.append((path, json.loads(value)))
+
+    except (getopt.GetoptError, ValueError):
+        usage()
+        sys.exit(2)
+
+    if len(modes) < 2:
+        usage()
+        sys.exit(2)
+
+    if check(modes, overrides, seed):
+        print('[INFO] All the modes agree')
+    else:
+        print('[INFO] The modes disagree (see above)')
+        sys.exit(1)
+
+
+# ==================================================================================================================
+
+if __name__ == "__main__":
+
+    main(sys.argv[1:])
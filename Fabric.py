@@ -1,12 +1,22 @@
 __author__ = 'shahargino'
 
-import simpy
+from Mailbox import Mailbox
+from Messages import Initiator_dequeue, Socket_granted, Message_for_target, Ack_from_target, Bridge_crossing
 from Fabric_socket import Fabric_socket
 from Fabric_arbiter import Fabric_arbiter
 
 
 class Fabric(object):
-    """This class implements the Fabric entity (e.g. AF, AXI, etc.), to be used in simulation"""
+    """
+        This class implements the Fabric entity (e.g. AF, AXI, etc.), to be used in simulation
+
+        Notes:
+        ~~~~~~
+        (1) A fabric arbitrates and dequeues its own initiators only, i.e. those connected to its initiator sockets
+        (2) Fabrics may be composed into a hierarchy or a mesh through bridge sockets (see Fabric_socket), each hop
+            is looked up in the fabric's next-hop tables (see Config.compile_topology), by target ID for requests
+            and by initiator ID for ACKs
+    """
 
     # ----------------------------------------------------------------------------------------
     def __init__(self, name, params, tb):
@@ -14,73 +24,250 @@ class Fabric(object):
         self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
-        self.clk_ns = 1000.0 / self.params['FREQUENCY_MHZ']
+        self.clk_ns = self.params.CLK_NS
+        self.clock = tb['CLOCKS'].get(self.params.CLK_PS)
+        self.event_driven = tb['MODE'] == 'EVENT_DRIVEN'
+        self.inbox = Mailbox(self.env, self.receive)
 
         self.initiators = {}
         self.queues = {}
-        for initiator_name, initiator in tb['INITIATORS'].items():
-            self.initiators[initiator_name] = initiator
-            self.queues[initiator_name] = initiator.get_queues()
+        for initiator_name in self.params.INITIATORS:
+            self.initiators[initiator_name] = tb['INITIATORS'][initiator_name]
+            self.queues[initiator_name] = self.initiators[initiator_name].get_queues()
 
         self.targets = {}
-        for target_name, target in tb['TARGETS'].items():
-            self.targets[target_name] = target
+        for target_name in self.params.TARGETS:
+            self.targets[target_name] = tb['TARGETS'][target_name]
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
         self.sockets = {}
-        for socket_name, socket_params in self.params['SOCKETS'].items():
-            self.sockets[socket_name] = Fabric_socket(socket_name, socket_params, self, tb)
+        for socket_params in self.params.SOCKETS:
+            self.sockets[socket_params.NAME] = Fabric_socket(socket_params.NAME, socket_params, self, tb)
+
+        # Routing tables, indexed by the transactions' integer IDs (None = not connected to this fabric):
+        self.sockets_by_id = [self.sockets[socket_params.NAME] for socket_params in self.params.SOCKETS]
+        self.targets_by_id = [self.targets.get(name) for name in tb['IDS']['TARGETS']]
+        self.socket_id_by_initiator_id = [self.params.SOCKET_IDS.get(name) for name in tb['IDS']['INITIATORS']]
+        self.socket_id_by_target_id = [self.params.SOCKET_IDS.get(name) for name in tb['IDS']['TARGETS']]
+
+        # Next hops: a request is passed to a target or a bridge socket, an ACK to an initiator or a bridge socket:
+        self.request_route = self.params.ROUTE_BY_TARGET_ID
+        self.ack_route = self.params.ROUTE_BY_INITIATOR_ID
+        self.ack_inboxes = [self.initiators[name].inbox if name in self.initiators else
+                            self.sockets_by_id[self.ack_route[initiator_id]].inbox
+                            for name, initiator_id in tb['IDS']['INITIATORS'].items()]
+
+        # Hop latencies (ns), indexed by (source socket ID, destination socket ID), see Config.compile_fabric():
+        self.latency_ns = self.params.LATENCY_NS.tolist()
 
-        self.arbiter = Fabric_arbiter(self.params['ARBITER'], tb)
+        # A fabric with no initiators (e.g. a peripherals fabric) has nothing to arbitrate:
+        self.arbiter = None
+        if self.initiators:
+            self.arbiter = Fabric_arbiter(name, self.params.ARBITER, self.params.INITIATORS, tb)
 
-        self.action = self.env.process(self.run())
+            # The event-driven Fabric sleeps while no initiator is ready:
+            if self.arbiter.uses_ready or self.event_driven:
+                self.bind_queues()
 
-        for key, value in self.params.items():
-            self.debug(self.name, 'Created with %s = %s' % (key, value))
+            if self.event_driven:
+                self.action = self.env.process(self.run_grants())
+            elif tb['MODE'] == 'TICKED':
+                self.clock.attach(self.tick)
+            else:
+                self.action = self.env.process(self.run())
+
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Created with %s = %s', key, value)
 
     # ----------------------------------------------------------------------------------------
     def run(self):
 
         while True:
 
-            try:
-                yield self.env.timeout(self.clk_ns)
+            yield self.clock.next_edge()
+
+            self.tick()
+
+    # ----------------------------------------------------------------------------------------
+    def tick(self):
+
+        # Manage "Grants" for initiator sockets:
+        self.set_grants(self.arbiter.get_granted())
+
+    # ----------------------------------------------------------------------------------------
+    def receive(self, message):
+
+        # Pass requests towards their corresponding targets:
+        if isinstance(message, Initiator_dequeue):
+            if self.debug_en:
+                self.debug(self.name, 'Messaged received in Fabric: "%s"', message.request)
+            self.route_request(message.request, self.socket_id_by_initiator_id[message.request.src])
+
+        elif isinstance(message, Socket_granted):
+            self.dequeue(message.initiator)
+
+        elif isinstance(message, Message_for_target):
+            if self.debug_en:
+                self.debug(self.name, 'Passing the message to Target socket')
+            self.targets_by_id[message.request.dst].inbox.put(message)
+
+        elif isinstance(message, Ack_from_target):
+            if self.debug_en:
+                self.debug(self.name, 'ACK received from Target "%s"', message.target)
+            self.route_ack(message, self.socket_id_by_target_id[message.request.dst])
+
+        elif isinstance(message, Bridge_crossing):
+            if self.debug_en:
+                self.debug(self.name, 'Received through bridge socket #%d: "%s"', message.socket, message.message)
+            if isinstance(message.message, Ack_from_target):
+                self.route_ack(message.message, message.socket)
+            else:
+                self.route_request(message.message.request, message.socket)
+
+        else:
+            self.error(self.name, 'Invalid message "%s"' % (message,))
+
+    # ----------------------------------------------------------------------------------------
+    def route_request(self, request, source_socket_id):
+        """Passes a request to its next hop socket (target or bridge), delayed by the socket-to-socket latency"""
+
+        socket_id = self.request_route[request.dst]
+        self.sockets_by_id[socket_id].inbox.put_after(
+            self.latency_ns[source_socket_id][socket_id],
+            Message_for_target(request, self)
+        )
+
+    # ----------------------------------------------------------------------------------------
+    def route_ack(self, message, source_socket_id):
+        """Passes an ACK to its initiator, or to the next hop bridge socket, delayed by the socket-to-socket latency"""
+
+        self.ack_inboxes[message.initiator].put_after(
+            self.latency_ns[source_socket_id][self.ack_route[message.initiator]],
+            message
+        )
+
+    # ----------------------------------------------------------------------------------------
+    def connect(self, fabrics, tb):
+        """Connects the bridge sockets to their peer fabrics, once all the fabrics are created"""
+
+        for socket in self.sockets_by_id:
+            if socket.params.IS_BRIDGE:
+                socket.connect(fabrics, tb)
+
+    # ----------------------------------------------------------------------------------------
+    def bind_queues(self):
+        """Binds the initiators' queues to the arbiter, which then tracks their pending requests (ready bitmask)"""
+
+        for index, initiator_name in enumerate(self.arbiter.initiators):
+            for queue in self.queues[initiator_name].values():
+                queue.bind_arbiter(self.arbiter, index)
+
+    # ----------------------------------------------------------------------------------------
+    def reconfigure_arbiter(self, params):
+        """Replaces the arbiter's parameters in the middle of a run (see Checkpoint.py)"""
+
+        bound = self.arbiter.uses_ready or self.event_driven
+
+        self.arbiter.reconfigure(params)
+        if self.arbiter.uses_ready and not bound:
+            self.bind_queues()
+
+        self.params = self.params._replace(ARBITER=params)
+
+    # ----------------------------------------------------------------------------------------
+    def dequeue(self, initiator_name):
+
+        for queue_name, queue in self.queues[initiator_name].items():
+            if self.debug_en:
+                self.debug(self.name, "Dequeue from %s", queue_name)
+            queue.dequeue(self)
+
+    # ----------------------------------------------------------------------------------------
+    def set_grants(self, granted):
+
+        for socket_name, socket in self.sockets.items():
+            if socket.is_initiator():
+                socket.set_grant(socket_name == granted)
+
+    # ----------------------------------------------------------------------------------------
+    def next_edge(self, time_ns):
+        """Returns the first fabric clock edge at (or after) the given time"""
+
+        return self.clock.edge_time(time_ns)
+
+    # ----------------------------------------------------------------------------------------
+    def run_grants(self):
+        """
+            Event-driven counterpart of the clocked grant/dequeue flow of run() and the initiator sockets:
+            as in cycle-accurate mode, the initiator granted on a fabric clock edge is dequeued on the following
+            edge (once the edge's enqueues are done, see Socket_granted). Edges are processed as long as the
+            granted initiator's queues hold requests. Otherwise the Fabric sleeps until an enqueue to any
+            initiator if none is ready, else until an enqueue to the granted initiator or the next arbiter slot
+            boundary. The grants of the skipped edges and slots are then derived from their times at once
+            (see Fabric_arbiter.get_granted and idle). A work-conserving Fabric stays awake as long as any
+            initiator is ready, as its grant is handed over on the next edge.
+        """
+
+        idle = False
+
+        yield self.clock.next_edge()
+
+        while True:
+
+            edge = self.env.now
+            cycle = self.clock.get_cycle(edge)
 
-                # Manage "Grants" for initiator sockets:
-                granted = self.arbiter.get_granted()
+            # No initiator was ready on the skipped edges:
+            if idle:
+                self.arbiter.idle(self.clock.cycle_time(cycle - 1))
+                idle = False
 
-                for socket_name, socket in self.sockets.items():
-                    if socket.is_initiator():
-                        socket.set_grant(socket_name == granted)
+            # The initiator granted on the former edge is dequeued on this one (the first edge has none):
+            former = self.arbiter.get_granted(self.clock.cycle_time(cycle - 1)) if cycle > 1 else None
 
-            # Pass requests to their corresponding targets:
-            except simpy.Interrupt as interrupt:
+            granted = self.arbiter.get_granted()
+            self.set_grants(granted)
 
-                int_cause = interrupt.cause
+            while True:
 
-                if int_cause[0] == 'INITIATOR_DEQUEUE':
-                    self.debug(self.name, 'Messaged received in Fabric: "%s"' % int_cause[1])
-                    self.sockets[int_cause[1]['dst']].action.interrupt(
-                        ['MESSAGE_FOR_TARGET', int_cause[1]]
-                    )
+                if self.arbiter.work_conserving:
+                    awake = self.arbiter.ready
+                else:
+                    awake = not self.is_idle(granted)
 
-                elif int_cause[0] == 'SOCKET_GRANTED':
-                    for queue_name, queue in self.queues[int_cause[1]].items():
-                        self.debug(self.name, "Dequeue from %s" % queue_name)
-                        self.env.process( queue.dequeue(self) )
+                if former is not None and (awake or not self.is_idle(former)):
+                    self.inbox.put(Socket_granted(former))
+                    former = None
 
-                elif int_cause[0] == 'MESSAGE_FOR_TARGET':
-                    self.debug(self.name, 'Passing the message to Target socket')
-                    _tmp = [int_cause[0], int_cause[1], self]
-                    self.targets[int_cause[1]['dst']].action.interrupt(_tmp)
+                    # Once the edge's dequeue is done (its Mailbox delivery precedes this timeout):
+                    yield self.env.timeout(0)
+                    continue
 
-                elif int_cause[0] == 'ACK_FROM_TARGET':
-                    self.debug(self.name, 'ACK received from Target "%s"' % int_cause[1])
-                    self.initiators[int_cause[2]].action.interrupt(
-                        ['ACK_FROM_TARGET', int_cause[1]]
-                    )
+                if awake:
+                    break
 
+                if not self.arbiter.ready:
+                    yield self.arbiter.wait_ready()
+                    idle = True
                 else:
-                    self.error(self.name, 'Invalid interrupt "%s"' % int_cause[0])
+                    events = [self.env.timeout(self.arbiter.next_slot_time() - self.env.now)]
+                    for initiator_name in (granted, former):
+                        if initiator_name is not None:
+                            events += [queue.wait_enqueue() for queue in self.queues[initiator_name].values()]
+                    yield self.env.any_of(events)
+
+                # An enqueue within the edge's time step is still due to the edge:
+                if self.env.now > edge:
+                    break
+
+            # Next edge to process, i.e. the current time if it is an edge:
+            if not (self.clock.on_edge() and self.env.now > edge):
+                yield self.clock.next_edge()
+
+    # ----------------------------------------------------------------------------------------
+    def is_idle(self, initiator_name):
+
+        return all(queue.is_empty() for queue in self.queues[initiator_name].values())
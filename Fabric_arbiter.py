@@ -1,47 +1,200 @@
 __author__ = 'shahargino'
 
 
-from random import randint
+from Arbiter_policies import POLICIES
 
 
 class Fabric_arbiter:
-    """This class implements the arbiter core of the Fabric"""
+    """
+        This class implements the arbiter core of the Fabric
+
+        Notes:
+        ~~~~~~
+        (1) The grant policy is pluggable (POLICY, see Arbiter_policies.py), it is applied on every slot boundary
+            (SLOT_LENGTH). Slots are derived from the current time by get_granted(), in every execution mode,
+            i.e. a slot boundary takes effect on the fabric edge at (or after) it, whatever the events order.
+        (2) Initiators with pending requests are tracked by a ready bitmask, updated by the initiator queues on their
+            empty / non-empty transitions only (see queue_filled() and queue_drained()). The policy samples the
+            bitmask as of the beginning of the current time step (see sampled_ready()), i.e. a request enqueued
+            at the very time of a fabric edge is seen on the next edge, whatever the events order.
+        (3) A WORK_CONSERVING arbiter skips idle initiators, and a granted initiator which runs out of requests
+            hands the rest of its slot over to the next ready initiator (see Arbiter_policy.handover). The slot's
+            owner is kept apart from the granted initiator, the next slot boundary applies the policy to the owner.
+        (4) The arbiter may be reconfigured in the middle of a run (see Checkpoint.py), the currently granted
+            initiator is kept
+    """
 
     # ----------------------------------------------------------------------------------------
-    def __init__(self, params, tb):
+    def __init__(self, name, params, initiators, tb):
 
-        self.name = self.__class__.__name__
+        self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
-        self.initiators = tb['INITIATORS'].keys()
-        if self.params['START_AT'] == 'FIRST':
-            self.granted = 0
-        elif self.params['START_AT'] == 'RANDOM':
-            self.granted = randint(0, len(self.initiators))
-        else:
-            self.error(self.name, 'Invalid START_AT value: "%s"' % self.params['START_AT'])
+        self.initiators = list(initiators)
+        self.all_initiators = (1 << len(self.initiators)) - 1
+        self.ready = 0
+        self.ready_time = None  # Time of the last ready bitmask change, and the bitmask before it
+        self.former_ready = 0
+        self.granted_time = None  # Time of the last get_granted() evaluation
+        self.pending = [0] * len(self.initiators)  # Non-empty queues, per initiator
+        self.ready_event = None
+        self.slot = 0
+        self.set_policy()
+
+        if self.params.START_AT == 'FIRST':
+            self.owner = self.policy.start(0)
+        elif self.params.START_AT == 'RANDOM':
+            self.owner = self.policy.start(int(tb['RNG'].get(self.name).integers(len(self.initiators))))
+
+        self.granted = self.owner
+
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, ' Created with %s = %s', key, value)
+
+    # ----------------------------------------------------------------------------------------
+    def set_policy(self):
+
+        self.policy = POLICIES[self.params.POLICY](self.initiators, self.params)
+        self.work_conserving = self.params.WORK_CONSERVING
+        self.uses_ready = self.work_conserving or self.policy.USES_READY
+
+        # The new policy starts off the current ready initiators:
+        for index in range(len(self.initiators)):
+            if (self.ready >> index) & 1:
+                self.policy.set_ready(index, True)
+
+    # ----------------------------------------------------------------------------------------
+    def reconfigure(self, params):
+        """Replaces the arbiter's parameters (e.g. its POLICY) from the current simulation time on"""
+
+        # Slot boundaries before the current time are still due to the former parameters:
+        self.advance(self.previous_slot())
+
+        self.params = params
+        self.set_policy()
+        self.owner = self.granted = self.policy.start(self.granted)
+        self.slot = self.previous_slot()
+
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, ' Reconfigured with %s = %s', key, value)
+
+    # ----------------------------------------------------------------------------------------
+    def previous_slot(self):
+        """Returns the last slot which started before the current time"""
+
+        return -int(-self.env.now // self.params.SLOT_LENGTH) - 1
+
+    # ----------------------------------------------------------------------------------------
+    def advance(self, slot, candidates=None):
+        """
+            Applies the policy on every slot boundary up to the given slot, at once (see Arbiter_policy.skip),
+            the slots' owner is granted. The candidates do not change meanwhile (default: the current ones).
+        """
+
+        if self.slot >= slot:
+            return
+
+        if candidates is None:
+            candidates = self.sampled_ready() if self.uses_ready else self.all_initiators
 
-        self.action = self.env.process(self.run())
+        if candidates:
+            self.owner = self.policy.skip(self.owner, candidates, slot - self.slot)
 
-        for key, value in self.params.items():
-            self.debug(self.name, ' Created with %s = %s' % (key, value))
+        self.granted = self.owner
+        self.slot = slot
+
+        if self.debug_en:
+            self.debug(self.name, 'Slot #%s (%d out of %d) granted',
+                       self.initiators[self.granted], self.granted, len(self.initiators))
 
     # ----------------------------------------------------------------------------------------
-    def get_granted(self):
+    def idle(self, time_ns):
+        """Passes the slot boundaries up to the given time with no ready initiator"""
 
-        return list(self.initiators)[self.granted]
+        self.advance(int(time_ns // self.params.SLOT_LENGTH), 0 if self.uses_ready else self.all_initiators)
+        self.granted_time = time_ns
 
     # ----------------------------------------------------------------------------------------
-    def run(self):
+    def get_granted(self, time_ns=None):
+        """
+            Returns the initiator granted at the given time (default: now), which may not precede former calls.
+            The grant is evaluated once per time, later calls for the same time return the same initiator.
+        """
+
+        if time_ns is None:
+            time_ns = self.env.now
+
+        if self.granted_time is None or time_ns > self.granted_time:
+            self.granted_time = time_ns
 
-        while True:
+            self.advance(int(time_ns // self.params.SLOT_LENGTH))
+
+            # Work-conserving handover, from an idle granted initiator to a ready one:
+            ready = self.sampled_ready()
+            if self.work_conserving and ready and not (ready >> self.granted) & 1:
+                self.granted = self.policy.handover(self.granted, ready)
+
+        return self.initiators[self.granted]
+
+    # ----------------------------------------------------------------------------------------
+    def next_slot_time(self):
+        """Returns the time at which the current slot ends and the next initiator gets granted"""
+
+        slot = int(self.env.now // self.params.SLOT_LENGTH)
+        return (slot + 1) * self.params.SLOT_LENGTH
+
+    # ----------------------------------------------------------------------------------------
+    def queue_filled(self, index):
+        """Called by an initiator queue (see Initiator_queue.bind_arbiter) once it turns non-empty"""
+
+        self.pending[index] += 1
+        if self.pending[index] == 1:
+            self.set_ready(index, True)
+
+            if self.ready_event is not None:
+                self.ready_event.succeed()
+                self.ready_event = None
+
+    # ----------------------------------------------------------------------------------------
+    def queue_drained(self, index):
+        """Called by an initiator queue (see Initiator_queue.bind_arbiter) once it turns empty"""
+
+        self.pending[index] -= 1
+        if self.pending[index] == 0:
+            self.set_ready(index, False)
+
+    # ----------------------------------------------------------------------------------------
+    def set_ready(self, index, ready):
+        """Sets an initiator's ready bit, the bitmask before the first change within a time step is kept aside"""
+
+        if self.ready_time != self.env.now:
+            self.ready_time = self.env.now
+            self.former_ready = self.ready
+            self.policy.sample_ready()
+
+        if ready:
+            self.ready |= 1 << index
+        else:
+            self.ready &= ~(1 << index)
+
+        self.policy.set_ready(index, ready)
+
+    # ----------------------------------------------------------------------------------------
+    def sampled_ready(self):
+        """Returns the ready bitmask as of the beginning of the current time step"""
+
+        return self.former_ready if self.ready_time == self.env.now else self.ready
+
+    # ----------------------------------------------------------------------------------------
+    def wait_ready(self):
+        """Returns an event which is triggered once any idle initiator gets a pending request"""
 
-            yield self.env.timeout(self.params['SLOT_LENGTH'])
+        if self.ready_event is None:
+            self.ready_event = self.env.event()
 
-            self.debug(self.name, 'Slot #%s (%d out of %d) granted' %
-                       (list(self.initiators)[self.granted], self.granted, len(self.initiators)))
-            self.granted = (self.granted + 1) % len(self.initiators)
+        return self.ready_event
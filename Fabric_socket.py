@@ -1,11 +1,21 @@
 __author__ = 'shahargino'
 
 
-import simpy
+from Mailbox import Mailbox
+from Cdc_fifo import Cdc_fifo
+from Messages import Socket_granted, Message_for_target, Ack_from_target
 
 
 class Fabric_socket:
-    """This class implements the socket core of the Fabric"""
+    """
+        This class implements the socket core of the Fabric
+
+        Socket kinds (INIT_TGT):
+        ~~~~~~~~~~~~~~~~~~~~~~~~
+        (1) initiator - connects an initiator, which is granted by the fabric's arbiter
+        (2) target    - connects a target, requests are passed to the target through the fabric
+        (3) bridge    - connects a peer fabric (PEER), requests and ACKs are passed through a CDC FIFO
+    """
 
     # ----------------------------------------------------------------------------------------
     def __init__(self, name, params, parent, tb):
@@ -14,53 +24,87 @@ class Fabric_socket:
         self.env = tb['ENV']
         self.params = params
         self.parent = parent
-        self.clk_ns = parent.clk_ns
+        self.clock = parent.clock
         self.granted = True
+        self.event_driven = tb['MODE'] == 'EVENT_DRIVEN'
+        self.inbox = Mailbox(self.env, self.receive)
+        self.cdc = None
 
-        if self.params['INIT_TGT'] == 'initiator':
+        if self.params.IS_INITIATOR:
             self.granted = False
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
-        self.action = self.env.process(self.run())
+        # In event-driven mode the Fabric dequeues on behalf of granted sockets, hence no polling. In ticked mode
+        # only initiator sockets are ticked, while granted (see set_grant):
+        self.ticked = tb['MODE'] == 'TICKED'
+        if self.ticked:
+            if self.params.IS_INITIATOR:
+                self.clock.attach(self.tick, active=False)
+        elif not self.event_driven:
+            self.action = self.env.process(self.run())
 
-        for key, value in self.params.items():
-            self.debug(self.name, 'Created with %s = %s' % (key, value))
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Created with %s = %s', key, value)
 
     # ----------------------------------------------------------------------------------------
     def is_initiator(self):
 
-        return self.params['INIT_TGT'] == 'initiator'
+        return self.params.IS_INITIATOR
+
+    # ----------------------------------------------------------------------------------------
+    def connect(self, fabrics, tb):
+        """Connects a bridge socket to its peer fabric, once all the fabrics are created"""
+
+        peer = fabrics[self.params.PEER]
+        self.cdc = Cdc_fifo(self.parent.params.NAME + "_" + self.params.NAME, self.params.CDC_DEPTH,
+                            self.params.CDC_STAGES, peer, peer.params.SOCKET_IDS[self.params.PEER_SOCKET], tb)
 
     # ----------------------------------------------------------------------------------------
     def set_grant(self, val):
 
-        if not self.granted and val:
-            self.debug(self.name, '"%s" has been granted by Fabric Arbiter' % self.name)
+        if self.debug_en and not self.granted and val:
+            self.debug(self.name, '"%s" has been granted by Fabric Arbiter', self.name)
         self.granted = val
 
+        if self.ticked and self.params.IS_INITIATOR:
+            if val:
+                self.clock.activate(self.tick)
+            else:
+                self.clock.deactivate(self.tick)
+
     # ----------------------------------------------------------------------------------------
     def run(self):
 
         while True:
 
-            try:
-                yield self.env.timeout(self.clk_ns)
+            yield self.clock.next_edge()
 
-                if self.params['INIT_TGT'] == 'initiator' and self.granted:
-                    self.parent.action.interrupt(
-                        ["SOCKET_GRANTED", self.name[len(self.__class__.__name__ + "_"):]]
-                    )
+            self.tick()
+
+    # ----------------------------------------------------------------------------------------
+    def tick(self):
+
+        if self.params.IS_INITIATOR and self.granted:
+            self.parent.inbox.put(
+                Socket_granted(self.params.NAME)
+            )
+
+    # ----------------------------------------------------------------------------------------
+    def receive(self, message):
 
-            except simpy.Interrupt as interrupt:
+        if self.cdc is not None and isinstance(message, (Message_for_target, Ack_from_target)):
+            self.cdc.write(message)
 
-                int_cause = interrupt.cause
+        elif isinstance(message, Message_for_target):
 
-                if int_cause[0] == 'MESSAGE_FOR_TARGET':
+            if self.is_initiator():
+                self.error(self.name, 'An Initiator socket cannot receive Target messages')
 
-                    if self.is_initiator():
-                        self.error(self.name, 'An Initiator socket cannot receive Target messages')
+            else:
+                self.parent.inbox.put(message)
 
-                    else:
-                        self.parent.action.interrupt(int_cause)
+        else:
+            self.error(self.name, 'Invalid message "%s"' % (message,))
@@ -1,8 +1,12 @@
 __author__ = 'shahargino'
 
 
-from random import randint, choice
-import simpy
+from bisect import bisect_left
+import numpy as np
+from Clock_domains import PS_PER_NS
+from Mailbox import Mailbox
+from Random_streams import Draws
+from Messages import Grant
 
 
 class Initiator_procedure(object):
@@ -28,27 +32,64 @@ class Initiator_procedure(object):
 
         Technical notes:
         (1) Procedure sends a Request to its corresponding Queue directly through calling queue.enqueue()
-        (2) Procedure gets a Grant from its corresponding Queue through Interrupt (dequeue ringbell)
+        (2) Procedure gets a Grant message from its corresponding Queue through its Mailbox (dequeue ringbell)
         (3) Procedure is blocked when it reaches is outstanding quota
+        (4) Beats are issued on the edges of the initiator's clock domain (see Clock_domains.py): the first beat of
+            a burst is on the first edge after its start, hence beat times are exact integer-picosecond edges
+
+        Batched generation (BATCH_BURSTS > 0):
+        ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        Beat times only depend on the bursts start times, hence the beat times, destinations and inter-burst
+        gaps of BATCH_BURSTS upcoming bursts are drawn at once with NumPy (and lazily refilled). The procedure
+        is then woken up only on beats at which it may actually issue a request: when blocked by its
+        outstanding quota it sleeps until a Grant arrives (or the burst ends), and once it reaches its BW
+        allocation it skips the rest of the burst.
     """
 
     # ----------------------------------------------------------------------------------------
-    def __init__(self, name, params, clk_ns, tb):
+    def __init__(self, name, params, clock, tb):
 
         self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
-        self.clk_ns = clk_ns
+        self.clock = clock
         self.queue = None
         self.outstanding = 0
+        self.payload_bytes = 0
+        self.burst_start_time_ns = 0
+        self.inbox = Mailbox(self.env, self.receive)
+        self.grant_event = None
+
+        self.initiator_name = params.INITIATOR
+        self.procedure_name = params.NAME
+        self.src = params.INITIATOR_ID
+        self.queue_id = params.QUEUE_ID
+        self.pool = tb['POOL']
+        self.rng = tb['RNG'].get(self.name)
 
         self.message = tb['AUX'].message
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
-        self.action = self.env.process(self.run())
+        self.action = self.start()
 
-        self.debug(self.name, 'Created with params: %s' % params)
+        self.debug(self.name, 'Created with params: %s', params)
+
+    # ----------------------------------------------------------------------------------------
+    def start(self):
+        """Starts the procedure's generation process"""
+
+        self.destination_ids = self.params.DESTINATION_IDS
+
+        if self.params.BATCH_BURSTS > 0:
+            self.next_block_start = self.env.now
+            return self.env.process(self.run_batched())
+
+        self.destination_draws = Draws(self.rng, len(self.destination_ids))
+        self.gap_draws = Draws(self.rng, self.params.INTER_BURSTS + 1)
+
+        return self.env.process(self.run())
 
     # ----------------------------------------------------------------------------------------
     def bind_queue(self, queue):
@@ -58,66 +99,138 @@ class Initiator_procedure(object):
     # ----------------------------------------------------------------------------------------
     def get_queue_name(self):
 
-        return self.params['QUEUE']
+        return self.params.QUEUE
 
     # ----------------------------------------------------------------------------------------
-    def send_request(self, destination, size_in_bytes, addr_gen):
+    def send_request(self, destination, size_in_bytes, addr_gen, operation=None):
+        """Enqueues a request to a target ID (addr_gen is either the address generation mode or the actual address)"""
+
+        if self.debug_en:
+            self.debug(self.name, 'Request sent (outstanding: %d out of %d)', self.outstanding+1, self.params.OUTSTANDING)
 
-        self.debug(self.name, 'Request sent (outstanding: %d out of %d)' % (self.outstanding+1, self.params['OUTSTANDING']))
+        request = self.pool.acquire(operation or self.params.DIRECTION, self.src, self.queue_id, destination,
+                                    size_in_bytes, addr_gen, self.env.now, self)
 
-        res = self.queue.enqueue(
-            {'operation':  self.params['DIRECTION'],
-             'src':        [self.name[len(self.__class__.__name__ + "_"):].split('_')[0], self.params['QUEUE']],
-             'dst':        destination,
-             'size':       size_in_bytes,
-             'addr_gen':   addr_gen,
-             'timestamp':  self.env.now}
-        )
+        res = self.queue.enqueue(request)
 
         if res == 'OK':
             self.outstanding += 1
+        else:
+            self.pool.release(request)
+
+        return res
 
     # ----------------------------------------------------------------------------------------
     def run(self):
 
-        payload_bytes = 0
+        while True:
+
+            average_bw = 0
+            self.payload_bytes = 0
+            self.burst_start_time_ns = self.env.now
+
+            for beat in range(self.params.BURST_LENGTH):
+
+                yield self.clock.next_edge()
+
+                if self.outstanding < self.params.OUTSTANDING:
+
+                    if average_bw < self.params.THR_IN_MBPS:
+
+                        self.send_request(self.destination_ids[self.destination_draws.next()],
+                                          self.params.BURST_SIZE, self.params.ADDRESS_GEN)
+
+                        elapsed_time_ns = self.env.now - self.burst_start_time_ns
+                        average_bw = 1000.0 * self.payload_bytes / elapsed_time_ns
+
+                    elif self.debug_en:
+                        self.debug(self.name, 'Stalled: reached maximum BW allocation (%.02fMBPS)', average_bw)
+
+                elif self.debug_en:
+                    self.debug(self.name, 'Stalled: reached maximum outstanding allocation (%d)', self.outstanding)
+
+            yield self.env.timeout(self.gap_draws.next())
+
+    # ----------------------------------------------------------------------------------------
+    def refill(self):
+        """Draws the beat times, destinations and inter-burst gaps of the next block of bursts"""
+
+        bursts = self.params.BATCH_BURSTS
+        burst_length = self.params.BURST_LENGTH
+        period_ps = self.clock.period_ps
+
+        # A burst starts a gap after the previous one's last beat (an edge), hence its first beat is a whole number
+        # of cycles after that beat, i.e. the first beat cycles are a cumulative sum:
+        gaps_ps = self.rng.integers(0, self.params.INTER_BURSTS + 1, bursts) * PS_PER_NS
+        first_cycles = self.clock.get_cycle(self.next_block_start) + 1 + \
+            np.concatenate(([0], np.cumsum(burst_length + gaps_ps[:-1] // period_ps)))
+        last_beats_ps = (first_cycles + burst_length - 1) * period_ps
+        starts_ps = np.concatenate(([int(round(self.next_block_start * PS_PER_NS))], last_beats_ps[:-1] + gaps_ps[:-1]))
+        beat_times = (first_cycles[:, None] + np.arange(burst_length)) * period_ps / PS_PER_NS
+
+        self.next_block_start = (last_beats_ps[-1] + gaps_ps[-1]) / PS_PER_NS
+        self.block_starts = (starts_ps / PS_PER_NS).tolist()
+        self.block_beat_times = beat_times.tolist()
+        self.block_destinations = self.rng.integers(0, len(self.destination_ids), (bursts, burst_length)).tolist()
+
+    # ----------------------------------------------------------------------------------------
+    def run_batched(self):
 
         while True:
 
-            try:
+            self.refill()
+
+            for start_time_ns, beat_times, destinations in zip(self.block_starts, self.block_beat_times,
+                                                               self.block_destinations):
+
                 average_bw = 0
-                payload_bytes = 0
-                burst_start_time_ns = self.env.now
+                self.payload_bytes = 0
+                self.burst_start_time_ns = start_time_ns
 
-                for beat in range(self.params['BURST_LENGTH']):
+                beat = 0
+                while beat < len(beat_times):
 
-                    yield self.env.timeout(self.clk_ns)
+                    if beat_times[beat] > self.env.now:
+                        yield self.env.timeout(beat_times[beat] - self.env.now)
 
-                    if self.outstanding < self.params['OUTSTANDING']:
+                    if self.outstanding >= self.params.OUTSTANDING:
+                        if self.debug_en:
+                            self.debug(self.name, 'Stalled: reached maximum outstanding allocation (%d)', self.outstanding)
 
-                        if average_bw < self.params['THR_IN_MBPS']:
+                        self.grant_event = self.env.event()
+                        yield self.grant_event | self.env.timeout(max(0, beat_times[-1] - self.env.now))
+                        self.grant_event = None
 
-                            self.send_request(choice(['SRAM','ROM']), self.params['BURST_SIZE'], self.params['ADDRESS_GEN'])
+                        beat = bisect_left(beat_times, self.env.now, beat + 1)
+                        continue
 
-                            elapsed_time_ns = self.env.now - burst_start_time_ns
-                            average_bw = 1000.0 * payload_bytes / elapsed_time_ns
+                    if average_bw >= self.params.THR_IN_MBPS:
+                        if self.debug_en:
+                            self.debug(self.name, 'Stalled: reached maximum BW allocation (%.02fMBPS)', average_bw)
+                        break
 
-                        else:
-                            self.debug(self.name, 'Stalled: reached maximum BW allocation (%.02fMBPS)' % average_bw)
+                    self.send_request(self.destination_ids[destinations[beat]], self.params.BURST_SIZE, self.params.ADDRESS_GEN)
 
-                    else:
-                        self.debug(self.name, 'Stalled: reached maximum outstanding allocation (%d)' % self.outstanding)
+                    elapsed_time_ns = self.env.now - self.burst_start_time_ns
+                    average_bw = 1000.0 * self.payload_bytes / elapsed_time_ns
+
+                    beat += 1
+
+    # ----------------------------------------------------------------------------------------
+    def receive(self, message):
 
-                yield self.env.timeout(randint(0, self.params['INTER_BURSTS']))
+        if isinstance(message, Grant):
+            self.outstanding -= 1
 
-            except simpy.Interrupt as interrupt:
+            # Grants which arrive before the (precomputed) start of the current burst belong to the previous one:
+            if self.env.now >= self.burst_start_time_ns:
+                self.payload_bytes += message.request.size
 
-                int_cause = interrupt.cause
+            if self.grant_event is not None and not self.grant_event.triggered:
+                self.grant_event.succeed()
 
-                if int_cause == 'Grant':
-                    self.outstanding -= 1
-                    payload_bytes += self.params['BURST_SIZE']
-                    self.debug(self.name, 'Grant received (outstanding: %d out of %d)' % (self.outstanding, self.params['OUTSTANDING']))
+            if self.debug_en:
+                self.debug(self.name, 'Grant received (outstanding: %d out of %d)', self.outstanding, self.params.OUTSTANDING)
 
-                else:
-                    self.error(self.name, 'Unknown interrupt: %s' % int_cause)
+        else:
+            self.error(self.name, 'Unknown message: %s' % (message,))
@@ -1,7 +1,9 @@
 __author__ = 'shahargino'
 
-import simpy
+from Mailbox import Mailbox
+from Messages import Ack_from_target
 from Initiator_procedure import Initiator_procedure
+from Initiator_trace import Initiator_trace
 from Initiator_queue import Initiator_queue
 
 
@@ -16,6 +18,8 @@ class Initiator_process(object):
                                    - etc.
 
          (2) Queue sharing is supported, i.e. different procedures may share same queues
+
+         (3) Trace-driven procedures (TRACES) replay recorded workloads, alongside the synthetic PROCEDURES
     """
 
     # ----------------------------------------------------------------------------------------
@@ -24,28 +28,47 @@ class Initiator_process(object):
         self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
-        self.clk_ns = 1000.0 / self.params['FREQUENCY_MHZ']
+        self.clk_ns = self.params.CLK_NS
+        self.clock = tb['CLOCKS'].get(self.params.CLK_PS)
+        self.event_driven = tb['MODE'] == 'EVENT_DRIVEN'
+        self.inbox = Mailbox(self.env, self.receive)
+        self.acks = 0
+        self.ack_bytes = 0
+        self.recorder = tb['RECORDER']
+        self.stats = tb['STATS']
+        self.pool = tb['POOL']
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
         self.procedures = {}
-        for procedure_name, procedure_params in self.params['PROCEDURES'].items():
-            self.procedures[procedure_name] = Initiator_procedure(name + "_" + procedure_name, procedure_params, self.clk_ns, tb)
+        for procedure_params in self.params.PROCEDURES:
+            self.procedures[procedure_params.NAME] = Initiator_procedure(name + "_" + procedure_params.NAME,
+                                                                         procedure_params, self.clock, tb)
+
+        for trace_params in self.params.TRACES:
+            self.procedures[trace_params.NAME] = Initiator_trace(name + "_" + trace_params.NAME,
+                                                                 trace_params, self.clock, tb)
 
         self.queues = {}
-        for queue_name, queue_params in self.params['QUEUES'].items():
-            self.queues[queue_name] = Initiator_queue(name + "_" + queue_name, queue_params, self.clk_ns, tb)
+        for queue_params in self.params.QUEUES:
+            self.queues[queue_params.NAME] = Initiator_queue(name + "_" + queue_params.NAME, queue_params, self.clock, tb)
 
         for procedure_name, procedure in self.procedures.items():
             queue = self.queues[procedure.get_queue_name()]
             procedure.bind_queue(queue)
             queue.bind_procedure(procedure_name, procedure)
 
-        self.action = self.env.process(self.run())
+        # In ticked mode there is nothing to tick but the queues fullness debug:
+        if tb['MODE'] == 'TICKED':
+            if self.debug_en:
+                self.clock.attach(self.tick)
+        elif not self.event_driven:
+            self.action = self.env.process(self.run())
 
-        for key, value in self.params.items():
-            self.debug(self.name, 'Created with %s = %s' % (key, value))
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Created with %s = %s', key, value)
 
     # ----------------------------------------------------------------------------------------
     def get_queues(self):
@@ -57,19 +80,32 @@ class Initiator_process(object):
 
         while True:
 
-            try:
+            yield self.clock.next_edge()
 
-                yield self.env.timeout(self.clk_ns)
+            self.tick()
+
+    # ----------------------------------------------------------------------------------------
+    def tick(self):
+
+        if self.debug_en:
+            for queue_name, queue in self.queues.items():
+                self.debug(self.name, 'Queue "%s" fullness: %d / %d', queue_name, queue.get_fullness(), queue.get_quota())
+
+    # ----------------------------------------------------------------------------------------
+    def receive(self, message):
 
-                for queue_name, queue in self.queues.items():
-                    self.debug(self.name, 'Queue "%s" fullness: %d / %d' % (queue_name, queue.get_fullness(), queue.get_quota()))
+        if isinstance(message, Ack_from_target):
+            self.acks += 1
+            self.ack_bytes += message.request.size
+            self.stats.record(message.request, self.env.now)
 
-            except simpy.Interrupt as interrupt:
+            if self.recorder is not None:
+                self.recorder.record(message.request, self.env.now)
 
-                int_cause = interrupt.cause
+            self.pool.release(message.request)
 
-                if int_cause[0] == 'ACK_FROM_TARGET':
-                    self.debug(self.name, 'ACK received from %s' % int_cause[1])
+            if self.debug_en:
+                self.debug(self.name, 'ACK received from %s', message.target)
 
-                else:
-                    self.error(self.name, 'Invalid interrupt "%s"' % int_cause[0])
\ No newline at end of file
+        else:
+            self.error(self.name, 'Invalid message "%s"' % (message,))
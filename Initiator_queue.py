@@ -1,83 +1,178 @@
 __author__ = 'shahargino'
 
 
-import simpy
+from Messages import Grant, Initiator_dequeue
 
 
 class Initiator_queue(object):
-    """This class implements a queue entity, to be used in simulation"""
+    """
+        This class implements a queue entity, to be used in simulation
+
+        Notes:
+        ~~~~~~
+        (1) The requests are held by a ring buffer, pop() and peek() are synchronous O(1) calls, hence
+            dequeueing on grant is a plain method call (events are used only for waiting, see wait_enqueue())
+        (2) Fullness is accounted in bytes, against QUOTA (DEPTH x WIDTH). The ring buffer starts with DEPTH
+            entries (a request per WIDTH bytes) and doubles once full, as smaller requests take more entries
+            (up to QUOTA, a request takes at least a byte).
+    """
 
     # ----------------------------------------------------------------------------------------
-    def __init__(self, name, params, clk_ns, tb):
+    def __init__(self, name, params, clock, tb):
 
         self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
-        self.clk_ns = clk_ns
-        self.store = simpy.Store(self.env)
+        self.clock = clock
+        self.ring = [None] * params.DEPTH
+        self.head = 0   # Oldest request's index
+        self.count = 0  # Requests in the ring buffer
         self.fullness = 0
         self.overflow = 0
         self.underflow = 0
+        self.enqueued = 0
+        self.dequeued = 0
+        self.overflows = 0
         self.procedures = {}
-        self.depth = params['DEPTH']
-        self.width = params['WIDTH']
+        self.depth = params.DEPTH
+        self.width = params.WIDTH
+        self.event_driven = tb['MODE'] == 'EVENT_DRIVEN'
+        self.enqueue_event = None
+        self.recorder = tb['RECORDER']
+        self.arbiter = None
+        self.initiator_index = None
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
+        self.detailed_en = tb['AUX'].debug_enabled(self.name, 2)  # Queue contents
         self.error = tb['AUX'].error
 
-        self.action = self.env.process(self.run())
+        # Nothing to poll in event-driven (and ticked) mode, enqueue/dequeue are driven by their callers:
+        if tb['MODE'] == 'CYCLE_ACCURATE':
+            self.action = self.env.process(self.run())
 
-        for key, value in self.params.items():
-            self.debug(self.name, 'Created with %s = %s' % (key, value))
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Created with %s = %s', key, value)
 
     # ----------------------------------------------------------------------------------------
     def enqueue(self, request):
 
-        if self.fullness <= (self.depth * self.width) - request['size']:
-            self.fullness += request['size']
-            self.overflow = 0
-            self.store.put(request)
+        if self.fullness <= self.params.QUOTA - request.size:
+            if self.fullness == 0 and self.arbiter is not None:
+                self.arbiter.queue_filled(self.initiator_index)
 
-            self.debug(self.name, 'Enqueue: %s ' % request)
-            self.debug(self.name, 'Items currently in queue (%d):' % len(self.store.items))
-            for item in self.store.items:
-                self.debug(self.name, item)
+            self.fullness += request.size
+            self.overflow = 0
+            self.enqueued += 1
+            if self.count == len(self.ring):
+                self.grow()
+            self.ring[(self.head + self.count) % len(self.ring)] = request
+            self.count += 1
+
+            if self.enqueue_event is not None:
+                self.enqueue_event.succeed()
+                self.enqueue_event = None
+
+            if self.debug_en:
+                self.debug(self.name, 'Enqueue: %s ', request)
+            if self.detailed_en:
+                self.debug_items()
             return 'OK'
 
         else:
             self.overflow = 1
-            self.debug(self.name, "Overflow:  fullness=%d, request=%d" % (self.fullness, request['size']))
+            self.overflows += 1
+            if self.debug_en:
+                self.debug(self.name, "Overflow:  fullness=%d, request=%d", self.fullness, request.size)
 
         return 'OVF'
 
     # ----------------------------------------------------------------------------------------
-    def dequeue(self, caller=None):
+    def grow(self):
+        """Doubles the ring buffer, the oldest request moves to its start"""
+
+        self.ring = self.get_items() + [None] * len(self.ring)
+        self.head = 0
+
+    # ----------------------------------------------------------------------------------------
+    def peek(self):
+        """Returns the oldest request (None if empty), without removing it"""
+
+        return self.ring[self.head] if self.count else None
+
+    # ----------------------------------------------------------------------------------------
+    def pop(self):
+        """Removes and returns the oldest request (None if empty)"""
+
+        if not self.count:
+            return None
+
+        request = self.ring[self.head]
+        self.ring[self.head] = None
+        self.head = (self.head + 1) % len(self.ring)
+        self.count -= 1
+
+        self.fullness -= request.size
+        self.dequeued += 1
 
-        if len(self.store.items):
+        if self.fullness == 0 and self.arbiter is not None:
+            self.arbiter.queue_drained(self.initiator_index)
+
+        return request
+
+    # ----------------------------------------------------------------------------------------
+    def dequeue(self, caller=None):
+        """Pops the oldest request and grants it (to its procedure, and to the caller, e.g. the Fabric)"""
 
-            self.debug(self.name, 'Dequeue started')
+        request = self.pop()
 
-            request = yield self.store.get()
+        if request is not None:
 
-            self.debug(self.name, 'Dequeue completed: %s' % request)
-            self.debug(self.name, 'Items currently in queue (%d):' % len(self.store.items))
-            for item in self.store.items:
-                self.debug(self.name, item)
+            if self.debug_en:
+                self.debug(self.name, 'Dequeue: %s', request)
+            if self.detailed_en:
+                self.debug_items()
 
-            self.fullness -= request['size']
             self.underflow = 0
 
-            self.debug(self.name, 'Sending "Grant" to procedure "%s"' % request['src'])
-            self.procedures[request['src'][1]].action.interrupt('Grant')
+            if self.recorder is not None:
+                request.t_dequeue = self.env.now
+
+            if self.debug_en:
+                self.debug(self.name, 'Sending "Grant" to procedure "%s"', request.procedure.name)
+            request.procedure.inbox.put(Grant(request))
 
             if caller is not None:
-                caller.action.interrupt(
-                    ['INITIATOR_DEQUEUE', request]
-                )
+                caller.inbox.put(Initiator_dequeue(request))
 
         else:
             self.underflow = 1
-            self.debug(self.name, "Underflow:  fullness=%d" % self.fullness)
+            if self.debug_en:
+                self.debug(self.name, "Underflow:  fullness=%d", self.fullness)
+
+        return request
+
+    # ----------------------------------------------------------------------------------------
+    def wait_enqueue(self):
+        """Returns an event which is triggered upon the next successful enqueue"""
+
+        if self.enqueue_event is None:
+            self.enqueue_event = self.env.event()
+
+        return self.enqueue_event
+
+    # ----------------------------------------------------------------------------------------
+    def get_items(self):
+        """Returns the queued requests, oldest first"""
+
+        return [self.ring[(self.head + index) % len(self.ring)] for index in range(self.count)]
+
+    # ----------------------------------------------------------------------------------------
+    def debug_items(self):
+
+        self.debug(self.name, 'Items currently in queue (%d):', self.count, level=2)
+        for item in self.get_items():
+            self.debug(self.name, '%s', item, level=2)
 
     # ----------------------------------------------------------------------------------------
     def is_overflow(self):
@@ -102,7 +197,17 @@ class Initiator_queue(object):
     # ----------------------------------------------------------------------------------------
     def get_quota(self):
 
-        return self.width * self.depth
+        return self.params.QUOTA
+
+    # ----------------------------------------------------------------------------------------
+    def bind_arbiter(self, arbiter, initiator_index):
+        """Reports the queue's empty / non-empty transitions to the Fabric arbiter (ready bitmask)"""
+
+        self.arbiter = arbiter
+        self.initiator_index = initiator_index
+
+        if not self.is_empty():
+            arbiter.queue_filled(initiator_index)
 
     # ----------------------------------------------------------------------------------------
     def bind_procedure(self, procedure_name, procedure):
@@ -114,4 +219,4 @@ class Initiator_queue(object):
 
         while True:
 
-            yield self.env.timeout(self.clk_ns)
+            yield self.clock.next_edge()
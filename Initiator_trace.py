@@ -0,0 +1,136 @@
+__author__ = 'shahargino'
+
+
+import mmap
+import numpy as np
+from Initiator_procedure import Initiator_procedure
+
+
+class Initiator_trace(Initiator_procedure):
+    """
+        This class implements a trace-driven procedure, which replays a recorded transactions trace
+
+        Trace format:
+        ~~~~~~~~~~~~~
+        A .npy file holding a 1-D structured array of DTYPE records, sorted by time (see save()):
+            time       - issue time, in ns, relative to the simulation start
+            operation  - 0 = read, 1 = write
+            address    - transaction's address
+            size       - transaction's size, in bytes
+            target     - index into the TARGETS parameter (target names)
+
+        Technical notes:
+        (1) The trace is memory-mapped and consumed CHUNK records at a time, with the kernel advised to read
+            it sequentially and to prefetch the next chunk, hence it is never loaded as a whole
+        (2) A single event is scheduled per distinct record time (records of the same time are issued together)
+        (3) Replay is back-pressured: a record waits for a Grant while the outstanding quota is reached, and is
+            retried on the next clock edge upon a queue overflow (records are never dropped)
+        (4) Records are validated a chunk at a time, an out of range operation or target is an error
+    """
+
+    DTYPE = np.dtype([
+        ('time',       np.float64),
+        ('operation',  np.uint8),
+        ('address',    np.uint64),
+        ('size',       np.uint32),
+        ('target',     np.uint16)
+    ])
+
+    OPERATIONS = ('read', 'write')
+
+    # ----------------------------------------------------------------------------------------
+    def start(self):
+
+        return self.env.process(self.run())
+
+    # ----------------------------------------------------------------------------------------
+    def open_trace(self):
+        """Memory-maps the trace file, returns the mapping, the records offset and the records array on top of it"""
+
+        with open(self.params.FILE, 'rb') as f:
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if dtype != self.DTYPE or len(shape) != 1:
+                self.error(self.name, 'Invalid trace file "%s" (dtype %s, shape %s)' % (self.params.FILE, dtype, shape))
+
+            offset = f.tell()
+            trace_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hasattr(trace_map, 'madvise'):
+            trace_map.madvise(mmap.MADV_SEQUENTIAL)
+
+        return trace_map, offset, np.frombuffer(trace_map, dtype=self.DTYPE, count=shape[0], offset=offset)
+
+    # ----------------------------------------------------------------------------------------
+    def prefetch(self, trace_map, offset, first, last):
+        """Advises the kernel to read ahead the [first, last) records range"""
+
+        if hasattr(trace_map, 'madvise') and first < last:
+            start = offset + first * self.DTYPE.itemsize
+            aligned = start - start % mmap.PAGESIZE
+            trace_map.madvise(mmap.MADV_WILLNEED, aligned, start - aligned + (last - first) * self.DTYPE.itemsize)
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+
+        trace_map, offset, records = self.open_trace()
+        start_time_ns = self.env.now
+        chunk_size = self.params.CHUNK
+        targets = self.params.TARGET_IDS
+
+        for first in range(0, len(records), chunk_size):
+
+            chunk = records[first:first + chunk_size]
+            if chunk['operation'].max() >= len(self.OPERATIONS) or chunk['target'].max() >= len(targets):
+                invalid = (chunk['operation'] >= len(self.OPERATIONS)) | (chunk['target'] >= len(targets))
+                index = np.flatnonzero(invalid)[0]
+                self.error(self.name, 'Invalid trace file "%s" (record #%d: operation %d, target %d, %d targets)' %
+                           (self.params.FILE, first + index, chunk['operation'][index], chunk['target'][index],
+                            len(targets)))
+
+            self.prefetch(trace_map, offset, first + chunk_size, min(len(records), first + 2 * chunk_size))
+
+            times = (chunk['time'] + start_time_ns).tolist()
+            operations = chunk['operation'].tolist()
+            addresses = chunk['address'].tolist()
+            sizes = chunk['size'].tolist()
+            destinations = chunk['target'].tolist()
+
+            for index in range(len(times)):
+
+                if times[index] > self.env.now:
+                    yield self.env.timeout(times[index] - self.env.now)
+
+                while self.outstanding >= self.params.OUTSTANDING:
+                    if self.debug_en:
+                        self.debug(self.name, 'Stalled: reached maximum outstanding allocation (%d)', self.outstanding)
+
+                    self.grant_event = self.env.event()
+                    yield self.grant_event
+                    self.grant_event = None
+
+                while self.send_request(targets[destinations[index]], sizes[index], addresses[index],
+                                        self.OPERATIONS[operations[index]]) != 'OK':
+                    yield self.clock.next_edge()
+
+        if self.debug_en:
+            self.debug(self.name, 'Trace completed (%d records)', len(records))
+
+    # ----------------------------------------------------------------------------------------
+    @classmethod
+    def save(cls, path, time_ns, operation, address, size, target):
+        """Writes a trace file out of per-field sequences (records are sorted by time)"""
+
+        records = np.zeros(len(time_ns), dtype=cls.DTYPE)
+        records['time'] = time_ns
+        records['operation'] = operation
+        records['address'] = address
+        records['size'] = size
+        records['target'] = target
+
+        np.save(path, records[np.argsort(records['time'], kind='stable')])
@@ -0,0 +1,169 @@
+__author__ = 'shahargino'
+
+
+from time import perf_counter
+from simpy.events import NORMAL
+
+
+class Component_stats(object):
+
+    __slots__ = ('scheduled', 'processed', 'messages', 'wall_s')
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+
+        self.scheduled = 0
+        self.processed = 0
+        self.messages = 0
+        self.wall_s = 0.0
+
+
+class Instrumentation(object):
+    """
+        This class implements an opt-in (PROFILE) per-component instrumentation layer
+
+        Notes:
+        ~~~~~~
+        (1) Per component: events scheduled (while running its code), events processed (its generators resumes
+            and its Mailbox deliveries), messages delivered to its Mailbox (the former interrupts) and the wall
+            time spent running its code
+        (2) Installed on the Environment instance, before the testbench is built: env.process() wraps every
+            generator (attributed to the component owning it), env.schedule() attributes the scheduled events.
+            Mailboxes (and CDC FIFOs) are wrapped by attach(), once the testbench is built.
+        (3) Nothing is wrapped when disabled, i.e. the run loops are untouched
+        (4) Events scheduled or processed outside of any component's code (e.g. while building) are attributed
+            to OTHER
+        (5) In TICKED mode the components ticks run within their clock domain's driver, hence are attributed to it
+    """
+
+    OTHER = '(other)'
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, env):
+
+        self.env = env
+        self.stats = {}
+        self.current = self.OTHER
+
+        schedule = env.schedule
+        process = env.process
+
+        def instrumented_schedule(event, priority=NORMAL, delay=0):
+            self.get_stats(self.current).scheduled += 1
+            schedule(event, priority, delay)
+
+        env.schedule = instrumented_schedule
+        env.process = lambda generator: process(self.wrap_generator(generator))
+
+    # ----------------------------------------------------------------------------------------
+    def get_stats(self, tag):
+
+        stats = self.stats.get(tag)
+        if stats is None:
+            stats = self.stats[tag] = Component_stats()
+
+        return stats
+
+    # ----------------------------------------------------------------------------------------
+    def wrap_generator(self, generator):
+        """Returns a generator which resumes the given (component's) generator, with time and events accounting"""
+
+        owner = generator.gi_frame.f_locals.get('self') if generator.gi_frame else None
+        tag = getattr(owner, 'name', generator.__name__)
+        stats = self.get_stats(tag)
+
+        value, error = None, None
+        while True:
+
+            previous, self.current = self.current, tag
+            start = perf_counter()
+            try:
+                event = generator.send(value) if error is None else generator.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                stats.wall_s += perf_counter() - start
+                stats.processed += 1
+                self.current = previous
+
+            try:
+                value, error = (yield event), None
+            except Exception as e:  # E.g. simpy.Interrupt, passed on to the component's generator
+                value, error = None, e
+
+    # ----------------------------------------------------------------------------------------
+    def wrap_callback(self, tag, callback):
+        """Returns an event callback (or a handler) with time and events accounting"""
+
+        stats = self.get_stats(tag)
+
+        def instrumented_callback(event):
+
+            # Nested (e.g. Mailbox.arrive() --> Mailbox.deliver()), already accounted for:
+            if self.current == tag:
+                return callback(event)
+
+            previous, self.current = self.current, tag
+            start = perf_counter()
+            try:
+                return callback(event)
+            finally:
+                stats.wall_s += perf_counter() - start
+                stats.processed += 1
+                self.current = previous
+
+        return instrumented_callback
+
+    # ----------------------------------------------------------------------------------------
+    def wrap_mailbox(self, tag, mailbox):
+
+        stats = self.get_stats(tag)
+        handler = mailbox.handler
+
+        def instrumented_handler(message):
+            stats.messages += 1
+            handler(message)
+
+        mailbox.handler = instrumented_handler
+        mailbox.deliver = self.wrap_callback(tag, mailbox.deliver)
+        mailbox.arrive = self.wrap_callback(tag, mailbox.arrive)
+
+    # ----------------------------------------------------------------------------------------
+    def attach(self, tb):
+        """Wraps the Mailboxes (and CDC FIFOs) of the testbench's components"""
+
+        components = list(tb['TARGETS'].values())
+
+        for initiator in tb['INITIATORS'].values():
+            components += [initiator] + list(initiator.procedures.values())
+
+        for fabric in tb['FABRICS'].values():
+            components += [fabric] + list(fabric.sockets.values())
+
+            for socket in fabric.sockets.values():
+                if socket.cdc is not None:
+                    socket.cdc.read = self.wrap_callback(socket.cdc.name, socket.cdc.read)
+
+        for component in components:
+            self.wrap_mailbox(component.name, component.inbox)
+
+    # ----------------------------------------------------------------------------------------
+    def report(self, tag, message):
+
+        total = Component_stats()
+        for stats in self.stats.values():
+            total.scheduled += stats.scheduled
+            total.processed += stats.processed
+            total.messages += stats.messages
+            total.wall_s += stats.wall_s
+
+        message(tag, 'Per-component profile (sorted by wall time):')
+        message(tag, '  %-45s %10s %10s %10s %10s %7s' % ('Component', 'Scheduled', 'Processed', 'Messages',
+                                                         'Wall [ms]', 'Wall %'))
+
+        rows = sorted(self.stats.items(), key=lambda row: row[1].wall_s, reverse=True)
+
+        for name, stats in rows + [('*', total)]:
+            message(tag, '  %-45s %10d %10d %10d %10.2f %6.1f%%' % (
+                name, stats.scheduled, stats.processed, stats.messages, 1000 * stats.wall_s,
+                100.0 * stats.wall_s / total.wall_s if total.wall_s else 0.0))
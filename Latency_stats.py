@@ -0,0 +1,160 @@
+__author__ = 'shahargino'
+
+
+from math import ceil
+
+
+class Latency_histogram(object):
+    """
+        This class implements a log-bucketed (HDR style) latency histogram
+
+        Notes:
+        ~~~~~~
+        (1) Latencies are recorded as integer picoseconds
+        (2) Values below 2^SUB_BITS are exact, above that every power-of-2 range is split into 2^(SUB_BITS-1)
+            linear sub-buckets, i.e. the relative error is below 1/2^(SUB_BITS-1) (~1.6%)
+        (3) Memory is bounded by the largest recorded value (< 4K counters for 64-bit values), not by the
+            number of recorded samples
+        (4) A percentile is reported as its bucket's middle value, clamped to the recorded min / max, i.e. within
+            half a bucket of the exact value, and exact when all the samples are equal
+    """
+
+    SUB_BITS = 7
+    SUB_COUNT = 1 << SUB_BITS
+    HALF_BITS = SUB_BITS - 1
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+
+        self.counts = [0] * self.SUB_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    # ----------------------------------------------------------------------------------------
+    def get_index(self, value):
+
+        shift = value.bit_length() - self.SUB_BITS
+        if shift <= 0:
+            return value
+
+        return (shift << self.HALF_BITS) + (value >> shift)
+
+    # ----------------------------------------------------------------------------------------
+    def get_value(self, index):
+        """Returns the middle value of the given bucket (its "equivalent" value)"""
+
+        if index < self.SUB_COUNT:
+            return index
+
+        shift = (index >> self.HALF_BITS) - 1
+        sub_bucket = index - (shift << self.HALF_BITS)
+
+        return (sub_bucket << shift) + (1 << (shift - 1))
+
+    # ----------------------------------------------------------------------------------------
+    def record(self, latency_ps):
+
+        index = self.get_index(latency_ps)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency_ps
+
+        if self.min is None or latency_ps < self.min:
+            self.min = latency_ps
+        if latency_ps > self.max:
+            self.max = latency_ps
+
+    # ----------------------------------------------------------------------------------------
+    def merge(self, other):
+
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+
+    # ----------------------------------------------------------------------------------------
+    def get_percentile(self, percentile):
+
+        if not self.count:
+            return 0
+
+        rank = max(1, int(ceil(self.count * percentile / 100.0)))
+
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return max(self.min, min(self.get_value(index), self.max))
+
+        return self.max
+
+    # ----------------------------------------------------------------------------------------
+    def get_mean(self):
+
+        return float(self.total) / self.count if self.count else 0.0
+
+
+class Latency_stats(object):
+    """This class collects End-to-End (request to ACK) latencies per (initiator, procedure, target)"""
+
+    PERCENTILES = (50, 99, 99.9)
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, target_names):
+
+        self.target_names = target_names
+        self.histograms = {}
+
+    # ----------------------------------------------------------------------------------------
+    def record(self, request, ack_time_ns):
+
+        key = (request.procedure, request.dst)
+
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Latency_histogram()
+
+        histogram.record(int(round(1000 * (ack_time_ns - request.timestamp))))
+
+    # ----------------------------------------------------------------------------------------
+    def reset(self):
+        """Discards the latencies recorded so far (e.g. during warm-up)"""
+
+        self.histograms = {}
+
+    # ----------------------------------------------------------------------------------------
+    def get_total(self):
+        """Returns a histogram which merges all the (initiator, procedure, target) histograms"""
+
+        total = Latency_histogram()
+        for histogram in self.histograms.values():
+            total.merge(histogram)
+
+        return total
+
+    # ----------------------------------------------------------------------------------------
+    def report(self, tag, message):
+
+        message(tag, 'End-to-End latency [ns]:')
+
+        rows = [((procedure.initiator_name, procedure.procedure_name, self.target_names[dst]), histogram)
+                for (procedure, dst), histogram in self.histograms.items()]
+        rows.sort(key=lambda row: row[0])
+
+        for key, histogram in rows + [(('*', '*', '*'), self.get_total())]:
+            message(tag, '  %-8s %-8s -> %-6s  count=%-8d mean=%-8.2f %s  max=%.2f' % (
+                key[0], key[1], key[2], histogram.count, histogram.get_mean() / 1000.0,
+                '  '.join('p%s=%-8.2f' % (p, histogram.get_percentile(p) / 1000.0) for p in self.PERCENTILES),
+                histogram.max / 1000.0))
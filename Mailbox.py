@@ -0,0 +1,67 @@
+__author__ = 'shahargino'
+
+
+from collections import deque
+
+
+class Mailbox(object):
+    """
+        This class implements a component's input port, replacing simpy.Interrupt based signalling
+
+        Notes:
+        ~~~~~~
+        (1) Messages are typed objects (see Messages.py), put() never blocks the sender
+        (2) Delivery costs a single SimPy event per mailbox and time step: all the messages which were put
+            at the same time are handed to the owner's handler, in order, once this event is processed
+        (3) The owner's process (if any) is not disturbed, i.e. its pending timeout and clock phase are kept
+        (4) put_after() models a transport delay with a single timeout event, the message joins the mailbox
+            (and is delivered right away) once the delay elapses
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, env, handler):
+
+        self.env = env
+        self.handler = handler
+        self.items = deque()
+        self.delivery = None
+
+    # ----------------------------------------------------------------------------------------
+    def put(self, message):
+
+        self.items.append(message)
+
+        if self.delivery is None:
+            self.delivery = self.env.event()
+            self.delivery.callbacks.append(self.deliver)
+            self.delivery.succeed()
+
+    # ----------------------------------------------------------------------------------------
+    def put_after(self, delay, message):
+
+        if delay > 0:
+            self.env.timeout(delay, message).callbacks.append(self.arrive)
+        else:
+            self.put(message)
+
+    # ----------------------------------------------------------------------------------------
+    def arrive(self, event):
+
+        self.items.append(event.value)
+
+        # Messages put at the same time are already pending a delivery, otherwise deliver within this event:
+        if self.delivery is None:
+            self.deliver(event)
+
+    # ----------------------------------------------------------------------------------------
+    def deliver(self, event):
+
+        self.delivery = None
+
+        while self.items:
+            self.handler(self.items.popleft())
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self):
+
+        return len(self.items)
@@ -0,0 +1,25 @@
+__author__ = 'shahargino'
+
+
+from collections import namedtuple
+
+
+# Typed messages exchanged between the simulation entities through their Mailbox:
+
+# Queue --> Fabric: a request has been dequeued from an initiator queue
+Initiator_dequeue = namedtuple('Initiator_dequeue', ['request'])
+
+# Fabric socket --> Fabric: the socket's initiator is granted (cycle-accurate mode only)
+Socket_granted = namedtuple('Socket_granted', ['initiator'])
+
+# Fabric --> Fabric socket --> Fabric --> Target: a request on its way to the target
+Message_for_target = namedtuple('Message_for_target', ['request', 'fabric'])
+
+# Target --> Fabric --> Initiator: the request has been served by the target
+Ack_from_target = namedtuple('Ack_from_target', ['target', 'initiator', 'request'])
+
+# Queue --> Procedure: the procedure's request has left the queue
+Grant = namedtuple('Grant', ['request'])
+
+# Bridge socket --> CDC FIFO --> peer Fabric: a request or an ACK entering a fabric through one of its bridge sockets
+Bridge_crossing = namedtuple('Bridge_crossing', ['message', 'socket'])
@@ -0,0 +1,71 @@
+__author__ = 'shahargino'
+
+
+import numpy as np
+
+
+# ----------------------------------------------------------------------------------------
+def spawned_seed(base_seed, index):
+    """Returns the index-th child of SeedSequence(base_seed), i.e. SeedSequence(base_seed).spawn(index + 1)[index]"""
+
+    return np.random.SeedSequence(base_seed, spawn_key=(index,))
+
+
+class Random_streams(object):
+    """
+        This class provides every component with its own random stream (numpy.random.Generator)
+
+        Notes:
+        ~~~~~~
+        (1) Streams are spawned (SeedSequence.spawn) from a master seed: global_params SEED, or a SeedSequence
+            (e.g. a replication's, see spawned_seed()). SEED = None draws a fresh master seed (not reproducible).
+        (2) Streams are spawned in components creation order, hence a given testbench and master seed always
+            yield the same streams, which are statistically independent of each other and of other replications
+        (3) Scalar draws out of a Generator are slow, hence hot paths draw through buffered Draws
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, seed):
+
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.streams = {}
+
+    # ----------------------------------------------------------------------------------------
+    def get(self, name):
+        """Returns the component's stream (spawned upon its first request)"""
+
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = self.streams[name] = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+
+        return stream
+
+    # ----------------------------------------------------------------------------------------
+    def get_entropy(self):
+
+        return self.seed_sequence.entropy
+
+
+class Draws(object):
+    """Uniform integer draws out of [0, high), drawn from a Generator in blocks of BLOCK"""
+
+    BLOCK = 1024
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, rng, high):
+
+        self.rng = rng
+        self.high = high
+        self.values = []
+        self.index = 0
+
+    # ----------------------------------------------------------------------------------------
+    def next(self):
+
+        if self.index == len(self.values):
+            self.values = self.rng.integers(0, self.high, self.BLOCK).tolist()
+            self.index = 0
+
+        self.index += 1
+
+        return self.values[self.index - 1]
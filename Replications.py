@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#  ___          _ _         _   _
+# | _ \___ _ __| (_)__ __ _| |_(_)___ _ _  ___
+# |   / -_) '_ \ | / _/ _` |  _| / _ \ ' \(_-<
+# |_|_\___| .__/_|_\__\__,_|\__|_\___/_||_/__/
+#         |_|
+#
+# Runs R independent replications of the include.py testbench, one per process-pool task, and reports the mean
+# and the confidence interval (Student's t, over the replications) of every summary metric.
+#
+# Replication #r runs with the r-th seed spawned out of the base seed (see Random_streams.spawned_seed), hence the
+# replications use statistically independent random streams, whichever process they run in.
+#
+# Confidence intervals take at least 2 replications, fewer than 5 are warned about (wide, unreliable intervals).
+#
+# Usage example (results table: one row per replication, followed by the MEAN and CI rows):
+#
+#     Replications.py -r 10 -j 4 -s 0 -c 0.95 -o replications.csv
+
+import sys
+import getopt
+from math import sqrt
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+from main import simulate
+from Sweep import base_params, write_table
+from Steady_state import t_quantile
+from Random_streams import spawned_seed
+
+
+MIN_REPLICATIONS = 5  # Advised, fewer replications are allowed (at least 2) but warned about
+
+
+# ----------------------------------------------------------------------------------------
+def usage():
+    print('Replications.py [-r <replications>] [-o <results.csv>] [-j <processes>] [-s <base_seed>] [-c <confidence>]')
+
+
+# ----------------------------------------------------------------------------------------
+def run_replication(task):
+    """Process-pool worker: runs a single replication and returns its results table row"""
+
+    index, base_seed = task
+
+    row = {'REPLICATION': index, 'SEED': base_seed}
+
+    try:
+        row.update(simulate(seed=spawned_seed(base_seed, index), **base_params()))
+
+    except (Exception, SystemExit) as e:
+        row['ERROR'] = repr(e)
+
+    return row
+
+
+# ----------------------------------------------------------------------------------------
+def replicate(replications, base_seed=0, processes=None):
+    """Runs the replications over a process pool (one per core by default), returns the rows in replications order"""
+
+    tasks = [(index, base_seed) for index in range(replications)]
+
+    pool = Pool(processes or cpu_count())
+    try:
+        rows = list(pool.imap(run_replication, tasks))
+    finally:
+        pool.close()
+        pool.join()
+
+    return rows
+
+
+# ----------------------------------------------------------------------------------------
+def confidence_intervals(rows, confidence=0.95):
+    """
+        Returns the {metric: (mean, half-width)} of the numeric metrics, over the successful replications
+        (the half-width is NaN with less than 2 successful replications)
+    """
+
+    rows = [row for row in rows if 'ERROR' not in row]
+
+    intervals = {}
+    for metric in rows[0] if rows else []:
+        values = [row[metric] for row in rows]
+        if metric in ('REPLICATION', 'SEED') or not all(isinstance(value, (int, float)) for value in values):
+            continue
+
+        values = np.array(values, dtype=float)
+        half_width = float('nan')
+        if len(values) > 1:
+            half_width = t_quantile((1 + confidence) / 2, len(values) - 1) * values.std(ddof=1) / sqrt(len(values))
+
+        intervals[metric] = (float(values.mean()), float(half_width))
+
+    return intervals
+
+
+# ----------------------------------------------------------------------------------------
+def main(argv):
+
+    replications = 10
+    results_file = 'replications.csv'
+    processes = None
+    base_seed = 0
+    confidence = 0.95
+
+    try:
+        opts, user_args = getopt.getopt(argv, "hr:o:j:s:c:")
+        for opt, user_arg in opts:
+            if opt == '-h':
+                usage()
+                sys.exit()
+            elif opt == '-r':
+                replications = int(user_arg)
+            elif opt == '-o':
+                results_file = user_arg
+            elif opt == '-j':
+                processes = int(user_arg)
+            elif opt == '-s':
+                base_seed = int(user_arg)
+            elif opt == '-c':
+                confidence = float(user_arg)
+
+    except (getopt.GetoptError, ValueError):
+        usage()
+        sys.exit(2)
+
+    if replications < 2:
+        print('[ERROR] Confidence intervals take at least 2 replications')
+        sys.exit(2)
+    elif replications < MIN_REPLICATIONS:
+        print('[WARNING] %d replications give wide and unreliable confidence intervals, %d or more are advised' % (
+            replications, MIN_REPLICATIONS))
+
+    print('[INFO] Running %d replications over %d processes' % (replications, processes or cpu_count()))
+
+    rows = replicate(replications, base_seed, processes)
+
+    failed = sum('ERROR' in row for row in rows)
+    if failed:
+        print('[WARNING] %d out of %d replications failed (see ERROR column)' % (failed, replications))
+
+    intervals = confidence_intervals(rows, confidence)
+
+    for metric, (mean, half_width) in intervals.items():
+        print('[INFO] %-28s %14.3f +- %-12.3f (%g%% confidence)' % (metric, mean, half_width, 100 * confidence))
+
+    rows.append(dict({'REPLICATION': 'MEAN'}, **{metric: mean for metric, (mean, _) in intervals.items()}))
+    rows.append(dict({'REPLICATION': 'CI'}, **{metric: half_width for metric, (_, half_width) in intervals.items()}))
+
+    write_table(rows, results_file)
+
+    print('[INFO] Results table written to %s' % results_file)
+
+
+# ==================================================================================================================
+
+if __name__ == "__main__":
+
+    main(sys.argv[1:])
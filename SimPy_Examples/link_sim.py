@@ -26,9 +26,7 @@ import sys
 import simpy
 import getopt
 from time import time
-from pandas import Series
-from numpy import arange, mean
-import matplotlib.pyplot as plt
+from numpy import arange, mean, empty, repeat, concatenate, full, array, dot, argsort, histogram, bincount
 from random import normalvariate
 
 global debug_en
@@ -45,6 +43,16 @@ run_mode_t = Struct(
     NonBypass = 2
 )
 
+# Link state trace codes (int8): the FSM states, followed by the transitions:
+link_states = ('IDLE', '1PACK', '2PACK', '4PACK',
+               'IDLE_to_1PACK', 'IDLE_to_4PACK', '1PACK_to_2PACK', '1PACK_to_4PACK', '2PACK_to_4PACK',
+               '4PACK_to_2PACK', '2PACK_to_1PACK', '1PACK_to_IDLE')
+link_state_code = dict((state, code) for code, state in enumerate(link_states))
+
+# Normalized power weights, per cycle of a state, and per fsm_delay_cyc of a transition (the others are free):
+state_power = { 'IDLE':0, '1PACK':1, '2PACK':2, '4PACK':4 }
+transition_power = { 'IDLE_to_1PACK':1, 'IDLE_to_4PACK':4, '1PACK_to_2PACK':2, '2PACK_to_4PACK':4 }
+
 # ------------------------------------------------------------------------------------------------------------------
 
 def usage():
@@ -85,6 +93,65 @@ def info(msg):
 
 # ------------------------------------------------------------------------------------------------------------------
 
+class GrowableArray(object):
+    """This class represents a preallocated NumPy array of a compact dtype, which doubles its capacity once full"""
+
+    def __init__(self, dtype, capacity=4096):
+        self.data = empty(capacity, dtype=dtype)
+        self.size = 0
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def append(self, value):
+        if self.size == len(self.data):
+            data = empty(2 * len(self.data), dtype=self.data.dtype)
+            data[:self.size] = self.data
+            self.data = data
+        self.data[self.size] = value
+        self.size += 1
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def values(self):
+        """Returns the appended values (a view, valid until the next append)"""
+        return self.data[:self.size]
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def __len__(self):
+        return self.size
+
+# ------------------------------------------------------------------------------------------------------------------
+
+class BwWindow(object):
+    """This class represents an AvgBW window, i.e. per-cycle dequeue bits, whose sum is maintained incrementally"""
+
+    def __init__(self, max_length, length):
+        self.bits = [1] * max_length
+        self.epochs = [0] * max_length  # a bit is valid only if written since the last fill (else it reads 1)
+        self.epoch = 0
+        self.length = length
+        self.sum = length
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def fill(self, length):
+        """Resets the window into 'length' ones, in O(1) (stale bits are invalidated by the epoch)"""
+        self.epoch += 1
+        self.length = length
+        self.sum = length
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def write(self, pos, bit):
+        if pos < self.length:
+            old_bit = self.bits[pos] if self.epochs[pos] == self.epoch else 1
+            self.sum += bit - old_bit
+            self.bits[pos] = bit
+            self.epochs[pos] = self.epoch
+
+# ------------------------------------------------------------------------------------------------------------------
+
 class Link(object):
     """This class represents the propagation through the Link"""
 
@@ -94,13 +161,14 @@ class Link(object):
         self.dummy = dummy
         self.cyc_step_ps = int(1e3/args.freq_ghz)
         self.consumer_quota = 0
-        self.consumer_bw = []
+        self.consumer_bw = GrowableArray('float64')        # run-length encoded: BW per run...
+        self.consumer_bw_cycles = GrowableArray('int64')   # ... and its length (cycles)
         self.enqueue_while_idle = False
         self.last_mark_cyc = 0
         self.last_dequeue_cyc = -1
         self.fsm_update_stack = []
-        self.link_state = []
-        self.buffer_fullness = []
+        self.link_state = GrowableArray('int8')         # link_states codes, per cycle (and per transition)
+        self.buffer_fullness = GrowableArray('uint16')  # per cycle
         
         self.cyc_curr = 0
         self.data_avl_cnt = {}
@@ -111,11 +179,12 @@ class Link(object):
         
         self.avg_bw_long_cond = False
         self.avg_bw_cond = {}
-        self.avg_bw_list = {}
+        self.avg_bw_win = {}
         self.avg_bw_win_start_cyc = {}
         for avg_bw_type in ('short', 'long'):
             self.avg_bw_cond[avg_bw_type] = False
-            self.avg_bw_list[avg_bw_type] = [1] * args.avg_bw_cyc[avg_bw_type]['4PACK']
+            self.avg_bw_win[avg_bw_type] = BwWindow(max(args.avg_bw_cyc[avg_bw_type].values()),
+                                                    args.avg_bw_cyc[avg_bw_type]['4PACK'])
             self.avg_bw_win_start_cyc[avg_bw_type] = 0
             self.init_avg_bw(avg_bw_type)
         
@@ -149,13 +218,12 @@ class Link(object):
             for avg_bw_type in ('short', 'long'):
                 self.avg_bw_cond[avg_bw_type] = False
                 avg_bw_win_cyc = self.cyc_curr - self.avg_bw_win_start_cyc[avg_bw_type]
-                if avg_bw_win_cyc < len(self.avg_bw_list[avg_bw_type]):
-                    self.avg_bw_list[avg_bw_type][avg_bw_win_cyc] = int(self.cyc_curr == self.last_dequeue_cyc)
+                self.avg_bw_win[avg_bw_type].write(avg_bw_win_cyc, int(self.cyc_curr == self.last_dequeue_cyc))
                 if self.state != "IDLE":
                     if avg_bw_win_cyc >= self.args.avg_bw_cyc[avg_bw_type][self.state]:
                         self.init_avg_bw(avg_bw_type)
                     elif (avg_bw_win_cyc > 0):
-                        self.avg_bw_cond[avg_bw_type] = sum(self.avg_bw_list[avg_bw_type]) < self.args.avg_bw_trns[avg_bw_type][self.state]
+                        self.avg_bw_cond[avg_bw_type] = self.avg_bw_win[avg_bw_type].sum < self.args.avg_bw_trns[avg_bw_type][self.state]
            
             # FSM State Update:
             if len(self.fsm_update_stack) > 0:
@@ -171,7 +239,7 @@ class Link(object):
                         self.init_avg_bw(avg_bw_type )
                     fsm_busy = False
                     if transition:
-                        self.link_state.append(transition)
+                        self.link_state.append(link_state_code[transition])
                     debug("time=%dps - Link FSM Update:  %s --> %s" % (self.env.now, old_state, new_state))
             
             # FSM State Evaluation (+registeration):
@@ -227,7 +295,7 @@ class Link(object):
             if not self.dummy:
                 if transition and not fsm_busy:
                     fsm_busy = True
-                self.link_state.append(self.state)
+                self.link_state.append(link_state_code[self.state])
                 self.buffer_fullness.append(len(self.store.items))
 
             # Cycle Incrementation:
@@ -238,12 +306,12 @@ class Link(object):
     def init_avg_bw(self, avg_bw_type):
         avg_bw_win_cyc = self.cyc_curr - self.avg_bw_win_start_cyc[avg_bw_type]
         if (avg_bw_win_cyc > 0):
-            avg_bw_gbps = (1e3/8.0) * sum(self.avg_bw_list[avg_bw_type]) / (avg_bw_win_cyc * self.cyc_step_ps)
+            avg_bw_gbps = (1e3/8.0) * self.avg_bw_win[avg_bw_type].sum / (avg_bw_win_cyc * self.cyc_step_ps)
             self.avg_bw_win_start_cyc[avg_bw_type] = self.cyc_curr
             self.avg_bw_cond[avg_bw_type] = False
             self.last_dequeue_cyc = -1
             if self.state != "IDLE":
-                self.avg_bw_list[avg_bw_type] = [1] * self.args.avg_bw_cyc[avg_bw_type][self.state]
+                self.avg_bw_win[avg_bw_type].fill(self.args.avg_bw_cyc[avg_bw_type][self.state])
             debug("time=%dps - Link AvgBW %s Reset, BW=%.2fGBps" % (self.env.now, avg_bw_type, avg_bw_gbps))
 
     # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
@@ -280,9 +348,16 @@ class Link(object):
 
     def mark_rate(self, rate):
         self.consumer_quota += 1
-        for k in range(self.cyc_curr-self.last_mark_cyc):
+        if self.cyc_curr > self.last_mark_cyc:
             self.consumer_bw.append(rate)
+            self.consumer_bw_cycles.append(self.cyc_curr-self.last_mark_cyc)
         self.last_mark_cyc = self.cyc_curr
+
+    # -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- -- --
+
+    def consumer_bw_trace(self):
+        """Returns the consumer BW per cycle (expanded out of its runs, for plotting)"""
+        return repeat(self.consumer_bw.values(), self.consumer_bw_cycles.values())
     
 # ------------------------------------------------------------------------------------------------------------------
 
@@ -507,6 +582,8 @@ def main(argv):
     # Plottings:
     if sys_params.plots_en:
 
+         import matplotlib.pyplot as plt  # only when plotting, its import dominates short runs
+
          info('')
          info('Plotting...')
 
@@ -516,17 +593,9 @@ def main(argv):
          ax = plt.subplot(421) if dual_mode else plt.subplot(321)
          plt.title('Link State over Time')
          plt.ylabel('State')
-         link_state_reduced = []
-         transitions = len([ state for state in simLink.link_state if "_to_" in state ])
-         for state in simLink.link_state:
-             if state == "IDLE":
-                 link_state_reduced.append(0)
-             elif state == "1PACK":
-                 link_state_reduced.append(1)
-             elif state == "2PACK":
-                 link_state_reduced.append(2)
-             elif state == "4PACK":
-                 link_state_reduced.append(3)
+         link_state = simLink.link_state.values()
+         link_state_reduced = link_state[link_state < link_state_code['IDLE_to_1PACK']]  # states only
+         transitions = len(link_state) - len(link_state_reduced)
          ax.step(arange(len(link_state_reduced)), link_state_reduced)
          plt.ylim([0,5.5])
          plt.yticks(arange(4), ('IDLE', '1PACK', '2PACK', '4PACK'))
@@ -535,15 +604,17 @@ def main(argv):
          ax = plt.subplot(423) if dual_mode else plt.subplot(323)
          plt.title('Buffer Fullness over Time')
          plt.ylabel('Fullness')
-         if simLink.buffer_fullness:
-             plt.ylim([0,max(simLink.buffer_fullness)+1])
-         ax.step(arange(len(simLink.buffer_fullness)), simLink.buffer_fullness)
+         buffer_fullness = simLink.buffer_fullness.values()
+         if len(buffer_fullness):
+             plt.ylim([0,int(buffer_fullness.max())+1])
+         ax.step(arange(len(buffer_fullness)), buffer_fullness)
 
          ax = plt.subplot(425) if dual_mode else plt.subplot(325)#, sharex=ax)
          plt.title('Consumer BW over Time')
          plt.ylabel('BW [GB/s]')
-         plt.ylim([0,max(simLink.consumer_bw)+1])
-         plt.plot(arange(len(simLink.consumer_bw)), simLink.consumer_bw)
+         consumer_bw = simLink.consumer_bw_trace()
+         plt.ylim([0,consumer_bw.max()+1])
+         plt.plot(arange(len(consumer_bw)), consumer_bw)
          if not dual_mode:
              plt.xlabel('Time [cyc]')
          
@@ -552,29 +623,30 @@ def main(argv):
              plt.title('Consumer BW over Time (Bypass)')
              plt.ylabel('BW [GB/s]')
              plt.xlabel('Time [cyc]')
-             plt.ylim([0,max(simLink_dummy.consumer_bw)+1])
-             plt.plot(arange(len(simLink_dummy.consumer_bw)), simLink_dummy.consumer_bw)
+             consumer_bw = simLink_dummy.consumer_bw_trace()
+             plt.ylim([0,consumer_bw.max()+1])
+             plt.plot(arange(len(consumer_bw)), consumer_bw)
 
          ax = plt.subplot(422) if dual_mode else plt.subplot(322)
          plt.title('Link State Histogram')
          plt.ylabel('State')
          if simLink.link_state:
-             plt.hist(link_state_reduced+[4]*transitions, align="left", bins=5)
+             plt.hist(concatenate((link_state_reduced, full(transitions, 4))), align="left", bins=5)
          plt.xticks(arange(5), ('IDLE', '1PACK', '2PACK', '4PACK', 'SWT'))
          plt.grid()
          
          ax = plt.subplot(424) if dual_mode else plt.subplot(324)
          plt.title('Buffer Fullness Histogram')
          plt.ylabel('Fullness')
-         if simLink.buffer_fullness:
-             plt.hist(simLink.buffer_fullness, align="left")
+         if len(buffer_fullness):
+             plt.hist(buffer_fullness, align="left")
          ax.set_xlim(left=0)
          plt.grid()
 
          ax = plt.subplot(426) if dual_mode else plt.subplot(326)
          plt.title('Consumer BW Histogram')
          plt.ylabel('BW [GB/s]')
-         plt.hist(simLink.consumer_bw, align="left")
+         plt.hist(simLink.consumer_bw.values(), weights=simLink.consumer_bw_cycles.values(), align="left")
          ax.set_xlim(left=0)
          plt.grid()
     
@@ -582,7 +654,7 @@ def main(argv):
              ax = plt.subplot(428)
              plt.title('Consumer BW Histogram (Bypass)')
              plt.ylabel('BW [GB/s]')
-             plt.hist(simLink_dummy.consumer_bw, align="left")
+             plt.hist(simLink_dummy.consumer_bw.values(), weights=simLink_dummy.consumer_bw_cycles.values(), align="left")
              ax.set_xlim(left=0)
              plt.grid()
 
@@ -603,7 +675,7 @@ def main(argv):
     info('Consumer Achieved BW:')
     sum_ = 0
     cnt_ = 0
-    consumer_bw_hist = plt.hist(simLink.consumer_bw)
+    consumer_bw_hist = histogram(simLink.consumer_bw.values(), weights=simLink.consumer_bw_cycles.values())
     for k in range(len(consumer_bw_hist[0])):
         bin_val = consumer_bw_hist[1][k]
         info('   %.2f GB/s --> x %d' % (bin_val, consumer_bw_hist[0][k]))
@@ -616,7 +688,7 @@ def main(argv):
         info('Consumer (Bypass) Achieved BW:')
         sum_ = 0
         cnt_ = 0
-        consumer_bw_hist = plt.hist(simLink_dummy.consumer_bw)
+        consumer_bw_hist = histogram(simLink_dummy.consumer_bw.values(), weights=simLink_dummy.consumer_bw_cycles.values())
         bin_size = max(consumer_bw_hist[1]) / 10
         for k in range(len(consumer_bw_hist[0])):
             bin_val = consumer_bw_hist[1][k]
@@ -627,34 +699,16 @@ def main(argv):
         info('   Quota = %d bits' % simLink_dummy.consumer_quota)
         info('')
     if not dummy_mode:
-        buffer_fullness_hist = plt.hist(simLink.buffer_fullness)
+        buffer_fullness_hist = histogram(simLink.buffer_fullness.values())
         info('Link State Historgam:')
-        power_time = 0
-        power_sum = 0.0
-        link_state_hist = Series(simLink.link_state).value_counts()
-        for state,freq in link_state_hist.items():
-            info('   %s --> x %d' % (state,freq))
-            power_wht = 0
-            if state == "IDLE":
-                power_time += freq
-            if state == "1PACK":
-                power_wht = 1
-                power_time += freq
-            elif state == "2PACK":
-                power_wht = 2
-                power_time += freq
-            elif state == "4PACK":
-                power_wht = 4
-                power_time += freq
-            elif state == "IDLE_to_4PACK":
-                power_wht = simLink.args.fsm_delay_cyc * 4
-            elif state == "IDLE_to_1PACK":
-                power_wht = simLink.args.fsm_delay_cyc * 1
-            elif state == "1PACK_to_2PACK":
-                power_wht = simLink.args.fsm_delay_cyc * 2
-            elif state == "2PACK_to_4PACK":
-                power_wht = simLink.args.fsm_delay_cyc * 4
-            power_sum += freq * power_wht
+        link_state_hist = bincount(simLink.link_state.values(), minlength=len(link_states))
+        for code in argsort(-link_state_hist, kind='stable'):  # most frequent first
+            if link_state_hist[code]:
+                info('   %s --> x %d' % (link_states[code], link_state_hist[code]))
+        power_wht = array([state_power[state] if state in state_power else
+                           simLink.args.fsm_delay_cyc * transition_power.get(state, 0) for state in link_states])
+        power_time = int(sum(link_state_hist[link_state_code[state]] for state in state_power))
+        power_sum = float(dot(link_state_hist, power_wht))
         power_normed = float(power_sum)/power_time
         info('')
         info('Normalized Power = %.2f (=%d/%d)' % (power_normed , power_sum, power_time))
@@ -0,0 +1,222 @@
+__author__ = 'shahargino'
+
+
+from math import sqrt, atan, sin, cos, pi
+import numpy as np
+
+
+# ----------------------------------------------------------------------------------------
+def t_cdf(t, dof):
+    """Returns Student's t distribution CDF, for an integer number of degrees of freedom (exact, A&S 26.7.3-4)"""
+
+    theta = atan(abs(t) / sqrt(dof))
+    cos_squared = cos(theta) ** 2
+
+    # P(|T| <= t), a finite series in cos(theta):
+    if dof % 2:
+        term = total = cos(theta) if dof > 1 else 0.0
+        for k in range(3, dof - 1, 2):
+            term *= (k - 1) / k * cos_squared
+            total += term
+        inside = 2 / pi * (theta + sin(theta) * total)
+    else:
+        term = total = 1.0
+        for k in range(2, dof - 1, 2):
+            term *= (k - 1) / k * cos_squared
+            total += term
+        inside = sin(theta) * total
+
+    return (1 + inside) / 2 if t >= 0 else (1 - inside) / 2
+
+
+# ----------------------------------------------------------------------------------------
+def t_quantile(p, dof):
+    """Returns Student's t distribution quantile, for an integer number of degrees of freedom (inverse of t_cdf)"""
+
+    if p < 0.5:
+        return -t_quantile(1 - p, dof)
+
+    high = 1.0
+    while t_cdf(high, dof) < p:
+        high *= 2
+
+    # Bisection, down to the float resolution:
+    low = 0.0
+    while True:
+        middle = (low + high) / 2
+        if not low < middle < high:
+            return middle
+        if t_cdf(middle, dof) < p:
+            low = middle
+        else:
+            high = middle
+
+
+# ----------------------------------------------------------------------------------------
+def mser_truncation(observations):
+    """Returns the MSER truncation point, i.e. the warm-up length (in observations) to be discarded"""
+
+    n = len(observations)
+
+    # Sums (and sums of squares) of the observations which are kept, per truncation point d:
+    tail_sum = np.cumsum(observations[::-1])[::-1]
+    tail_squares = np.cumsum(observations[::-1] ** 2)[::-1]
+    kept = n - np.arange(n)
+
+    mser = (tail_squares - tail_sum ** 2 / kept) / kept ** 2
+
+    # Truncation points beyond the first half are not trusted (few observations left):
+    return int(np.argmin(mser[:n // 2 + 1]))
+
+
+class Steady_state_monitor(object):
+    """
+        This class implements the run control of STEADY_STATE runs (warm-up truncation and early termination)
+
+        Notes:
+        ~~~~~~
+        (1) Throughput (ACK bytes) and mean latency are observed every STEADY_STATE_INTERVAL ns
+        (2) The warm-up transient is detected by MSER-5, i.e. MSER over means of 5 consecutive observations,
+            per metric, the later truncation point of both metrics is discarded. Observations with no ACKs are
+            left out of the latency's MSER, only the batches below must have ACKs.
+        (3) The rest is split into STEADY_STATE_BATCHES equally sized batches, whose means give the confidence
+            intervals (STEADY_STATE_CONFIDENCE). The run stops once the half-widths of both metrics are within
+            STEADY_STATE_PRECISION of their means, or else at SIMULATION_TIME_IN_CYCLES (time budget).
+        (4) MSER truncates up to half of the observations, hence a run lasts at least
+            2 x 5 x STEADY_STATE_BATCHES observation intervals
+    """
+
+    MSER_BATCH = 5
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, tb):
+
+        self.name = self.__class__.__name__
+        self.env = tb['ENV']
+        self.params = tb['CONFIG'].GLOBAL
+        self.initiators = list(tb['INITIATORS'].values())
+        self.stats = tb['STATS']
+        self.interval = self.params.STEADY_STATE_INTERVAL
+
+        # Per observation interval: ACK bytes, latencies sum (ps) and latencies count
+        self.ack_bytes = []
+        self.latency_sums = []
+        self.latency_counts = []
+        self.totals = (0, 0, 0)
+
+        self.results = {
+            'CONVERGED':                  False,
+            'WARMUP_NS':                  None,
+            'STEADY_THROUGHPUT_MBPS':     None,
+            'STEADY_THROUGHPUT_CI_MBPS':  None,
+            'STEADY_LATENCY_MEAN_NS':     None,
+            'STEADY_LATENCY_CI_NS':       None
+        }
+
+        self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
+        self.error = tb['AUX'].error
+
+        self.action = self.env.process(self.run())
+
+        for key in ('INTERVAL', 'BATCHES', 'CONFIDENCE', 'PRECISION'):
+            self.debug(self.name, 'Created with STEADY_STATE_%s = %s', key, getattr(self.params, 'STEADY_STATE_' + key))
+
+    # ----------------------------------------------------------------------------------------
+    def observe(self):
+
+        histograms = self.stats.histograms.values()
+        totals = (sum(initiator.ack_bytes for initiator in self.initiators),
+                  sum(histogram.total for histogram in histograms),
+                  sum(histogram.count for histogram in histograms))
+
+        self.ack_bytes.append(totals[0] - self.totals[0])
+        self.latency_sums.append(totals[1] - self.totals[1])
+        self.latency_counts.append(totals[2] - self.totals[2])
+        self.totals = totals
+
+    # ----------------------------------------------------------------------------------------
+    def estimate(self):
+        """Updates the steady-state estimates, returns True once the required precision is reached"""
+
+        size = self.MSER_BATCH
+        n = len(self.ack_bytes) // size
+        batches = self.params.STEADY_STATE_BATCHES
+
+        if n < 2 * batches:
+            return False
+
+        # MSER-5 observations, the latency of a batch is its ACKs mean:
+        ack_bytes = np.array(self.ack_bytes[:n * size], dtype=float).reshape(n, size).sum(axis=1)
+        latency_sums = np.array(self.latency_sums[:n * size], dtype=float).reshape(n, size).sum(axis=1)
+        latency_counts = np.array(self.latency_counts[:n * size], dtype=float).reshape(n, size).sum(axis=1)
+
+        throughput = 1000.0 * ack_bytes / (size * self.interval)
+
+        # Observations with no ACKs at all have no latency, the latency's MSER runs over the others:
+        acked = np.flatnonzero(latency_counts)
+        if not len(acked):
+            return False
+
+        latency = latency_sums[acked] / latency_counts[acked] / 1000.0
+
+        warmup = min(max(mser_truncation(throughput), int(acked[mser_truncation(latency)])), n // 2)
+
+        # Equally sized batches, the earliest leftover observations are discarded along with the warm-up:
+        batch = (n - warmup) // batches
+        warmup = n - batch * batches
+
+        if not latency_counts[warmup:].reshape(batches, batch).sum(axis=1).all():
+            return False  # No ACKs at all throughout some batch
+
+        throughput_means = throughput[warmup:].reshape(batches, batch).mean(axis=1)
+        latency_means = (latency_sums[warmup:].reshape(batches, batch).sum(axis=1) /
+                         latency_counts[warmup:].reshape(batches, batch).sum(axis=1) / 1000.0)
+
+        t = t_quantile((1 + self.params.STEADY_STATE_CONFIDENCE) / 2, batches - 1)
+
+        throughput_mean = throughput_means.mean()
+        throughput_ci = t * throughput_means.std(ddof=1) / sqrt(batches)
+        latency_mean = latency_sums[warmup:].sum() / latency_counts[warmup:].sum() / 1000.0
+        latency_ci = t * latency_means.std(ddof=1) / sqrt(batches)
+
+        precision = self.params.STEADY_STATE_PRECISION
+        converged = throughput_ci <= precision * throughput_mean and latency_ci <= precision * latency_mean
+
+        self.results.update({
+            'CONVERGED':                  bool(converged),
+            'WARMUP_NS':                  warmup * size * self.interval,
+            'STEADY_THROUGHPUT_MBPS':     float(throughput_mean),
+            'STEADY_THROUGHPUT_CI_MBPS':  float(throughput_ci),
+            'STEADY_LATENCY_MEAN_NS':     float(latency_mean),
+            'STEADY_LATENCY_CI_NS':       float(latency_ci)
+        })
+
+        if self.debug_en:
+            self.debug(self.name, 'Warm-up %.1f ns, throughput %.1f +- %.1f MBps, latency %.3f +- %.3f ns',
+                       self.results['WARMUP_NS'], throughput_mean, throughput_ci, latency_mean, latency_ci)
+
+        return converged
+
+    # ----------------------------------------------------------------------------------------
+    def get_results(self):
+
+        return self.results
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+        """Observes the metrics until they converge, or the time budget runs out (the run stops upon return)"""
+
+        budget = self.params.SIMULATION_TIME_IN_CYCLES
+
+        while self.env.now + self.interval <= budget:
+
+            yield self.env.timeout(self.interval)
+
+            self.observe()
+
+            if len(self.ack_bytes) % self.MSER_BATCH == 0 and self.estimate():
+                return
+
+        if budget > self.env.now:
+            yield self.env.timeout(budget - self.env.now)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+#  ___                        ___
+# / __|_ __ _____ ___ _ __   |   \ _ _(_)_ _____ _ _
+# \__ \ V  V / -_) -_) '_ \  | |) | '_| \ V / -_) '_|
+# |___/\_/\_/\___\___| .__/  |___/|_| |_|\_/\___|_|
+#                    |_|
+#
+# Runs a parameter sweep on top of the include.py dictionaries, one simulation per process-pool task.
+#
+# Sweep file (JSON), either a grid (cartesian product of all the listed values):
+#
+#     {"grid": {"initiators_params.CPU.PROCEDURES.*.THR_IN_MBPS": [50, 100, 200],
+#               "fabric_params.ARBITER.SLOT_LENGTH":              [5, 10]}}
+#
+# or an explicit list of points:
+#
+#     {"points": [{"initiators_params.*.QUEUES.*.DEPTH": 16},
+#                 {"initiators_params.*.QUEUES.*.DEPTH": 64}]}
+#
+# Override keys are dotted paths into include.py's dictionaries, '*' matches every key on its level.
+#
+# Point #i runs with the i-th seed spawned out of the base seed (see Random_streams.spawned_seed), i.e. the points
+# use statistically independent random streams.
+#
+# With a warm-up (-w <warmup_ns>), the base testbench is run once up to the warm-up time, then checkpointed and
+# forked into one continuation per point (see Checkpoint.py), measurements exclude the warm-up. Points may then
+# override arbiter and target parameters, and SIMULATION_TIME_IN_CYCLES (beyond the warm-up) only, e.g.:
+#
+#     {"grid": {"fabric_params.ARBITER.POLICY":       ["ROUND_ROBIN", "LEAST_RECENTLY_GRANTED"],
+#               "targets_params.SRAM.FREQUENCY_MHZ":  [200, 400]}}
+
+import sys
+import csv
+import json
+import getopt
+import itertools
+from copy import deepcopy
+from multiprocessing import Pool, cpu_count
+
+import include as inc
+import Checkpoint
+from Config import compile_config
+from Random_streams import spawned_seed
+from main import simulate, environment, configure, build, summarize
+
+
+PARAMS = ('global_params', 'fabric_params', 'initiators_params', 'targets_params')
+
+
+# ----------------------------------------------------------------------------------------
+def usage():
+    print('Sweep.py -i <sweep_file.json> [-o <results.csv>] [-j <processes>] [-s <base_seed>] [-w <warmup_ns>]')
+
+
+# ----------------------------------------------------------------------------------------
+def expand_grid(grid):
+    """Returns the list of points (override dicts) spanned by the cartesian product of the grid's values"""
+
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+
+# ----------------------------------------------------------------------------------------
+def apply_override(params, path, value):
+    """Sets a value in a copy of include.py's dictionaries, according to a dotted (wildcard) path"""
+
+    name, keys = path.split('.', 1)[0], path.split('.')[1:]
+    if name not in params or not keys:
+        raise KeyError('Invalid override path "%s"' % path)
+
+    nodes = [params[name]]
+    for key in keys[:-1]:
+        nodes = [child for node in nodes for child in (node.values() if key == '*' else [node[key]])]
+
+    for node in nodes:
+        if keys[-1] == '*':
+            for key in node:
+                node[key] = value
+        elif keys[-1] in node:
+            node[keys[-1]] = value
+        else:
+            raise KeyError('Invalid override path "%s" (no "%s" key)' % (path, keys[-1]))
+
+
+# ----------------------------------------------------------------------------------------
+def base_params(seed=None):
+    """Returns a copy of include.py's dictionaries, debug disabled (and SEED set, if given)"""
+
+    params = {name: deepcopy(getattr(inc, name)) for name in PARAMS}
+    params['global_params']['DEBUG_LEVEL'] = 0
+
+    if seed is not None:
+        params['global_params']['SEED'] = seed
+
+    return params
+
+
+# ----------------------------------------------------------------------------------------
+def run_point(task):
+    """Process-pool worker: runs a single sweep point and returns its results table row"""
+
+    index, overrides, base_seed = task
+
+    params = base_params()
+
+    row = {'POINT': index, 'SEED': base_seed}
+    row.update(overrides)
+
+    try:
+        for path, value in overrides.items():
+            apply_override(params, path, value)
+        row.update(simulate(seed=spawned_seed(base_seed, index), **params))
+
+    except (Exception, SystemExit) as e:
+        row['ERROR'] = repr(e)
+
+    return row
+
+
+# ----------------------------------------------------------------------------------------
+def sweep(points, base_seed=0, processes=None):
+    """Runs all the points over a process pool (one per core by default), returns the rows in points order"""
+
+    tasks = [(index, overrides, base_seed) for index, overrides in enumerate(points)]
+
+    pool = Pool(processes or cpu_count())
+    try:
+        rows = list(pool.imap(run_point, tasks))
+    finally:
+        pool.close()
+        pool.join()
+
+    return rows
+
+
+# ----------------------------------------------------------------------------------------
+def continue_point(tb, task):
+    """Forked continuation (see Checkpoint.fork): runs a single sweep point on top of the warmed-up testbench"""
+
+    index, overrides, base_seed = task
+
+    params = base_params(base_seed)
+
+    row = {'POINT': index, 'SEED': base_seed, 'WARMUP_NS': tb['MEASURE_START_NS']}
+    row.update(overrides)
+
+    try:
+        for path, value in overrides.items():
+            apply_override(params, path, value)
+
+        config = compile_config(params['global_params'], params['fabric_params'], params['initiators_params'],
+                                params['targets_params'], tb['AUX'].error)
+
+        if tb['ENV'].now >= config.GLOBAL.SIMULATION_TIME_IN_CYCLES:
+            tb['AUX'].error(__name__, 'The warm-up must end before SIMULATION_TIME_IN_CYCLES (%s ns)' %
+                            config.GLOBAL.SIMULATION_TIME_IN_CYCLES)
+
+        Checkpoint.reconfigure(tb, config)
+
+        tb['ENV'].run(until=config.GLOBAL.SIMULATION_TIME_IN_CYCLES)
+        row.update(summarize(tb))
+
+    except (Exception, SystemExit) as e:
+        row['ERROR'] = repr(e)
+
+    return row
+
+
+# ----------------------------------------------------------------------------------------
+def warm_sweep(points, warmup_ns, base_seed=0, processes=None):
+    """Runs the base testbench's warm-up once, then all the points as its forked continuations (common seed)"""
+
+    params = base_params(base_seed)
+
+    env = environment(params['global_params'])
+    config, aux = configure(env, params['global_params'], params['fabric_params'], params['initiators_params'],
+                            params['targets_params'])
+
+    if config.GLOBAL.TRACE_FILE or config.GLOBAL.PROFILE or config.GLOBAL.STEADY_STATE:
+        aux.error(__name__, 'TRACE_FILE, PROFILE and STEADY_STATE are not supported along with a warm-up')
+
+    tb = build(env, aux, config)
+
+    env.run(until=warmup_ns)
+    Checkpoint.reset_measurements(tb)
+
+    state = Checkpoint.snapshot(tb)
+    print('[INFO] Warmed up at %s ns: %d pending events, %d queued requests' % (
+        state['TIME_NS'], state['PENDING_EVENTS'], sum(len(items) for items in state['QUEUES'].values())))
+
+    tasks = [(index, overrides, base_seed) for index, overrides in enumerate(points)]
+
+    return Checkpoint.fork(tb, continue_point, tasks, processes)
+
+
+# ----------------------------------------------------------------------------------------
+def write_table(rows, path):
+
+    columns = []
+    for row in rows:
+        columns += [column for column in row if column not in columns]
+
+    with open(path, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# ----------------------------------------------------------------------------------------
+def main(argv):
+
+    sweep_file = None
+    results_file = 'sweep_results.csv'
+    processes = None
+    base_seed = 0
+    warmup_ns = None
+
+    try:
+        opts, user_args = getopt.getopt(argv, "hi:o:j:s:w:")
+        for opt, user_arg in opts:
+            if opt == '-h':
+                usage()
+                sys.exit()
+            elif opt == '-i':
+                sweep_file = user_arg
+            elif opt == '-o':
+                results_file = user_arg
+            elif opt == '-j':
+                processes = int(user_arg)
+            elif opt == '-s':
+                base_seed = int(user_arg)
+            elif opt == '-w':
+                warmup_ns = float(user_arg)
+
+    except (getopt.GetoptError, ValueError):
+        usage()
+        sys.exit(2)
+
+    if sweep_file is None:
+        usage()
+        sys.exit(2)
+
+    with open(sweep_file) as f:
+        spec = json.load(f)
+
+    points = expand_grid(spec['grid']) if 'grid' in spec else spec['points']
+
+    print('[INFO] Running %d sweep points over %d processes' % (len(points), processes or cpu_count()))
+
+    if warmup_ns is None:
+        rows = sweep(points, base_seed, processes)
+    else:
+        rows = warm_sweep(points, warmup_ns, base_seed, processes)
+    write_table(rows, results_file)
+
+    print('[INFO] Results table written to %s' % results_file)
+
+
+# ==================================================================================================================
+
+if __name__ == "__main__":
+
+    main(sys.argv[1:])
@@ -1,7 +1,8 @@
 __author__ = 'shahargino'
 
 
-import simpy
+from Mailbox import Mailbox
+from Messages import Message_for_target, Ack_from_target
 
 
 class Target_process(object):
@@ -13,32 +14,54 @@ class Target_process(object):
         self.name = self.__class__.__name__ + "_" + name
         self.env = tb['ENV']
         self.params = params
-        self.clk_ns = 1000.0 / self.params['FREQUENCY_MHZ']
+        self.clocks = tb['CLOCKS']
+        self.clock = self.clocks.get(self.params.CLK_PS)
+        self.event_driven = tb['MODE'] == 'EVENT_DRIVEN'
+        self.inbox = Mailbox(self.env, self.receive)
+        self.recorder = tb['RECORDER']
 
         self.debug = tb['AUX'].debug
+        self.debug_en = tb['AUX'].debug_enabled(self.name)
         self.error = tb['AUX'].error
 
-        self.action = self.env.process(self.run())
+        # Nothing to tick in ticked mode, targets are driven by their messages:
+        if tb['MODE'] == 'CYCLE_ACCURATE':
+            self.action = self.env.process(self.run())
 
-        for key, value in self.params.items():
-            self.debug(self.name, 'Created with %s = %s' % (key, value))
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Created with %s = %s', key, value)
 
     # ----------------------------------------------------------------------------------------
     def run(self):
 
         while True:
 
-            try:
-                yield self.env.timeout(self.clk_ns)
+            yield self.clock.next_edge()
 
-            except simpy.Interrupt as interrupt:
+    # ----------------------------------------------------------------------------------------
+    def reconfigure(self, params):
+        """Replaces the target's parameters (e.g. its FREQUENCY_MHZ) from the current simulation time on"""
+
+        self.params = params
+        self.clock = self.clocks.get(self.params.CLK_PS)
+
+        for key, value in self.params._asdict().items():
+            self.debug(self.name, 'Reconfigured with %s = %s', key, value)
+
+    # ----------------------------------------------------------------------------------------
+    def receive(self, message):
+
+        if isinstance(message, Message_for_target):
+            if self.debug_en:
+                self.debug(self.name, 'Message Received: "%s"', message.request)
 
-                int_cause = interrupt.cause
+            if self.recorder is not None:
+                message.request.t_target = self.env.now
 
-                if int_cause[0] == 'MESSAGE_FOR_TARGET':
-                    self.debug(self.name, 'Message Received: "%s"' % int_cause[1])
+            # ACK:
+            message.fabric.inbox.put(
+                Ack_from_target(self.name, message.request.src, message.request)
+            )
 
-                    # ACK:
-                    int_cause[2].action.interrupt(
-                        ['ACK_FROM_TARGET', self.name, int_cause[1]['src'][0]]
-                    )
+        else:
+            self.error(self.name, 'Invalid message "%s"' % (message,))
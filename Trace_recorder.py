@@ -0,0 +1,113 @@
+__author__ = 'shahargino'
+
+
+import json
+import struct
+import numpy as np
+
+
+class Trace_recorder(object):
+    """
+        This class implements an opt-in transaction trace recorder, one fixed-width record per transaction
+
+        Notes:
+        ~~~~~~
+        (1) Records are collected into a preallocated NumPy structured array (chunk), which is appended to a
+            .npy file once full, hence memory is bounded by the chunk size regardless of the run length
+        (2) The .npy header is rewritten with the final records count by close(), the trace can then be loaded
+            instantly as a memory-map through load() (or numpy.load(path, mmap_mode='r'))
+        (3) Initiators, queues and targets are stored as their integer IDs (see tb['IDS']), the names are kept
+            aside in a <path>.names.json file
+        (4) Delays are stored relative to the enqueue time, in ns
+    """
+
+    DTYPE = np.dtype([
+        ('initiator',  np.uint16),
+        ('queue',      np.uint16),
+        ('target',     np.uint16),
+        ('operation',  np.uint8),   # 0 = read, 1 = write
+        ('size',       np.uint32),
+        ('t_enqueue',  np.float64),
+        ('d_dequeue',  np.float32),
+        ('d_target',   np.float32),
+        ('d_ack',      np.float32)
+    ])
+
+    OPERATIONS = {'read': 0, 'write': 1}
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, path, ids, chunk_size=65536):
+
+        self.path = path
+        self.chunk = np.zeros(chunk_size, dtype=self.DTYPE)
+        self.index = 0
+        self.count = 0
+        self.names = {'initiator': dict(ids['INITIATORS']), 'queue': dict(ids['QUEUES']), 'target': dict(ids['TARGETS'])}
+
+        self.file = open(path, 'wb')
+        self.write_header()
+
+    # ----------------------------------------------------------------------------------------
+    def write_header(self):
+        """Writes a .npy (v1.0) header, padded to the same length for any records count"""
+
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+            np.lib.format.dtype_to_descr(self.DTYPE), self.count)
+
+        # magic (8) + header length (2) + header, aligned to 64 bytes with room for a 20-digits count:
+        header_len = 64 * ((len(header) - len(str(self.count)) + 20 + 11 + 63) // 64)
+        header = header.ljust(header_len - 11) + '\n'
+
+        self.file.write(np.lib.format.magic(1, 0) + struct.pack('<H', len(header)) + header.encode('latin1'))
+
+    # ----------------------------------------------------------------------------------------
+    def record(self, request, ack_time):
+        """Records a completed (acknowledged) transaction"""
+
+        t_enqueue = request.timestamp
+
+        self.chunk[self.index] = (
+            request.src,
+            request.queue,
+            request.dst,
+            self.OPERATIONS[request.operation],
+            request.size,
+            t_enqueue,
+            request.t_dequeue - t_enqueue,
+            request.t_target - t_enqueue,
+            ack_time - t_enqueue
+        )
+
+        self.index += 1
+        if self.index == len(self.chunk):
+            self.flush()
+
+    # ----------------------------------------------------------------------------------------
+    def flush(self):
+
+        self.file.write(self.chunk[:self.index].tobytes())
+        self.count += self.index
+        self.index = 0
+
+    # ----------------------------------------------------------------------------------------
+    def close(self):
+
+        self.flush()
+        self.file.seek(0)
+        self.write_header()
+        self.file.close()
+
+        with open(self.path + '.names.json', 'w') as f:
+            json.dump(self.names, f, indent=2)
+
+    # ----------------------------------------------------------------------------------------
+    @staticmethod
+    def load(path):
+        """Returns the trace records (memory-mapped) and the IDs-to-names tables"""
+
+        with open(path + '.names.json') as f:
+            names = json.load(f)
+
+        names = {kind: {v: k for k, v in ids.items()} for kind, ids in names.items()}
+
+        return np.load(path, mmap_mode='r'), names
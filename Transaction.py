@@ -0,0 +1,67 @@
+__author__ = 'shahargino'
+
+
+class Transaction(object):
+    """
+        This class implements a single transaction (request), from its enqueue until its ACK
+
+        Notes:
+        ~~~~~~
+        (1) src, queue and dst are integer IDs (see tb['IDS']), procedure is the issuing procedure itself,
+            hence routing a Grant, a message or an ACK needs no name lookup
+        (2) t_dequeue and t_target are only stamped when a Trace_recorder is enabled
+    """
+
+    __slots__ = ('operation', 'src', 'queue', 'dst', 'size', 'addr_gen', 'timestamp', 'procedure',
+                 't_dequeue', 't_target')
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, operation, src, queue, dst, size, addr_gen, timestamp, procedure):
+
+        self.operation = operation
+        self.src = src
+        self.queue = queue
+        self.dst = dst
+        self.size = size
+        self.addr_gen = addr_gen
+        self.timestamp = timestamp
+        self.procedure = procedure
+        self.t_dequeue = None
+        self.t_target = None
+
+    # ----------------------------------------------------------------------------------------
+    def __repr__(self):
+
+        return 'Transaction(%s, src=%d, queue=%d, dst=%d, size=%d, addr_gen=%s, timestamp=%.02f)' % (
+            self.operation, self.src, self.queue, self.dst, self.size, self.addr_gen, self.timestamp)
+
+
+class Transaction_pool(object):
+    """
+        This class implements an optional free-list of Transaction objects, recycled once acknowledged
+
+        Note: a recycled transaction must no longer be referenced, e.g. by the debug ring buffer records
+              (see Auxiliary), hence the pool is better left disabled when debugging.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, enabled):
+
+        self.enabled = enabled
+        self.free = []
+
+    # ----------------------------------------------------------------------------------------
+    def acquire(self, operation, src, queue, dst, size, addr_gen, timestamp, procedure):
+
+        if self.free:
+            transaction = self.free.pop()
+            transaction.__init__(operation, src, queue, dst, size, addr_gen, timestamp, procedure)
+            return transaction
+
+        return Transaction(operation, src, queue, dst, size, addr_gen, timestamp, procedure)
+
+    # ----------------------------------------------------------------------------------------
+    def release(self, transaction):
+
+        if self.enabled:
+            self.free.append(transaction)
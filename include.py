@@ -3,12 +3,56 @@ __author__ = 'shahargino'
 # ========================================================================================
 global_params = {
 
-    'DEBUG_LEVEL':  1,                      # 0 = no debug , 1 = debug prints enabled
+    'DEBUG_LEVEL':  1,                      # 0 = no debug , 1 = debug prints enabled, 2 = detailed (queue contents)
+
+    'DEBUG_COMPONENTS':  {},                # Per-component DEBUG_LEVEL, by name prefix, e.g. {'Initiator_queue': 0}
+
+    'DEBUG_RING_SIZE':  0,                  # Latest debug records kept in memory and dumped upon error, 0 = disabled
+
+    'TRACE_FILE':  None,                    # Transactions trace (.npy) path, None = disabled (see Trace_recorder.py)
+
+    'TRACE_CHUNK':  65536,                  # Trace records buffered in memory between file writes
+
+    'TRANSACTION_POOL':  False,             # Recycle acknowledged Transaction objects (keep disabled when debugging)
+
+    'SEED':  None,                          # Master seed of the components random streams, None = not reproducible
+
+    'PROFILE':  False,                      # Per-component events and wall time report (see Instrumentation.py)
+
+    'PROFILE_FILE':  None,                  # cProfile stats (.prof) of the Run Phase, None = disabled (see pstats)
+
+    'EXECUTION_MODE':  'CYCLE_ACCURATE',    # CYCLE_ACCURATE / TICKED (a tick() driver per clock domain) /
+                                            # EVENT_DRIVEN (components sleep until an event arrives)
+
+    'SCHEDULER':  'HEAP',                   # Events queue: HEAP (simpy.Environment) / CALENDAR (Calendar_environment.py)
+
+    'STEADY_STATE':  False,                 # Stop once steady-state metrics converge (see Steady_state.py), else run
+                                            # to SIMULATION_TIME_IN_CYCLES (which is the time budget either way)
+
+    'STEADY_STATE_INTERVAL':  100,          # Observation interval (ns)
+
+    'STEADY_STATE_BATCHES':  20,            # Batch means (post warm-up) per confidence interval
+
+    'STEADY_STATE_CONFIDENCE':  0.95,       # Confidence level
+
+    'STEADY_STATE_PRECISION':  0.05,        # Required relative half-width of the confidence intervals
 
     'SIMULATION_TIME_IN_CYCLES':  100       # Simulation time
 }
 
 # ========================================================================================
+# A single fabric (below), or a hierarchy / mesh of named fabrics connected by bridge sockets, e.g.:
+#
+#   fabric_params = {
+#       'DATA':    {'FREQUENCY_MHZ': 200, 'ARBITER': {...},
+#                   'SOCKETS': {'CPU': {...}, 'SRAM': {...},
+#                               'TO_PERIPH': {'PROTOCOL': 'AXI', 'RD_WR_CH': ('both', 64), 'INIT_TGT': 'bridge',
+#                                             'PEER': 'PERIPH',    # Peer fabric, bridged back by one of its sockets
+#                                             'CDC_DEPTH': 4,      # Clock-domain-crossing FIFO entries
+#                                             'CDC_STAGES': 2}}},  # Synchronizer stages, in peer fabric's cycles
+#       'PERIPH':  {'FREQUENCY_MHZ': 50, 'ARBITER': {...},
+#                   'SOCKETS': {'ROM': {...}, 'TO_DATA': {..., 'INIT_TGT': 'bridge', 'PEER': 'DATA'}}}
+#   }
 fabric_params = {
 
     # --------------------------
@@ -16,9 +60,14 @@ fabric_params = {
 
     # --------------------------
     'ARBITER': {
-        'POLICY':       'ROUND_ROBIN',  # ROUND_ROBIN
-        'SLOT_LENGTH':  5,              # in fabric's cycles
-        'START_AT':     'FIRST'         # FIRST / RANDOM
+        'POLICY':           'ROUND_ROBIN',  # ROUND_ROBIN / WEIGHTED_ROUND_ROBIN / STRICT_PRIORITY /
+                                            # LEAST_RECENTLY_GRANTED / TDMA (see Arbiter_policies.py)
+        'SLOT_LENGTH':      5,              # in fabric's cycles
+        'START_AT':         'FIRST',        # FIRST / RANDOM
+        'WORK_CONSERVING':  False,          # Skip idle initiators, and hand an idle initiator's slot over
+        'WEIGHTS':          {},             # WEIGHTED_ROUND_ROBIN slots per initiator, e.g. {'CPU': 2} (default 1)
+        'PRIORITIES':       {},             # STRICT_PRIORITY levels per initiator, higher first (default 0)
+        'SCHEDULE':         []              # TDMA slots owners, e.g. ['CPU', 'CPU', 'PCIE'] (default all in order)
     },
 
     # --------------------------
@@ -26,9 +75,9 @@ fabric_params = {
 
         'CPU': {
             'PROTOCOL':  'AXI',
-            'RD_WR_CH':  {'both', 64},
+            'RD_WR_CH':  ('both', 64),   # read / write / both, data width
             'INIT_TGT':  'initiator',
-            'LATENCIES':  {
+            'LATENCIES':  {             # Hop latency towards each socket, in fabric's cycles
                 'CPU':   0,
                 'PCIE':  1,
                 'SRAM':  1,
@@ -38,9 +87,9 @@ fabric_params = {
 
         'PCIE': {
             'PROTOCOL':  'AXI',
-            'RD_WR_CH':  {'both', 64},
+            'RD_WR_CH':  ('both', 64),   # read / write / both, data width
             'INIT_TGT':  'initiator',
-            'LATENCIES':  {
+            'LATENCIES':  {             # Hop latency towards each socket, in fabric's cycles
                 'CPU':   0,
                 'PCIE':  1,
                 'SRAM':  1,
@@ -50,7 +99,7 @@ fabric_params = {
 
         'SRAM': {
             'PROTOCOL':  'AXI',
-            'RD_WR_CH':  {'both', 64},
+            'RD_WR_CH':  ('both', 64),   # read / write / both, data width
             'INIT_TGT':  'target',
             'LATENCIES':  {}
 
@@ -59,7 +108,7 @@ fabric_params = {
 
         'ROM': {
             'PROTOCOL':  'AXI',
-            'RD_WR_CH':  {'both', 64},
+            'RD_WR_CH':  ('both', 64),   # read / write / both, data width
             'INIT_TGT':  'target',
             'LATENCIES':  {}
         }
@@ -92,7 +141,8 @@ initiators_params = {
                 'OUTSTANDING':   10,        # Maximal amount of outstanding transactions
                 'ADDRESS_GEN':   'random',  # random / raster
                 'BUS_WIDTH':     8,         # Bus width, in bytes
-                'QUEUE':         'AXI_WR'
+                'QUEUE':         'AXI_WR',
+                'BATCH_BURSTS':  0          # 0 = per-beat generation, N = bursts drawn at once (see Initiator_procedure)
             },
 
             'AXI_RD': {
@@ -104,10 +154,22 @@ initiators_params = {
                 'OUTSTANDING':   10,        # Maximal amount of outstanding transactions
                 'ADDRESS_GEN':   'raster',  # random / raster
                 'BUS_WIDTH':     8,         # Bus width, in bytes
-                'QUEUE':         'AXI_RD'
+                'QUEUE':         'AXI_RD',
+                'BATCH_BURSTS':  0          # 0 = per-beat generation, N = bursts drawn at once (see Initiator_procedure)
             }
         },
 
+        'TRACES': {
+            # Trace-driven procedures (see Initiator_trace.py), e.g.:
+            # 'REPLAY': {
+            #     'FILE':         'cpu_trace.npy',    # Recorded transactions trace
+            #     'TARGETS':      ['SRAM', 'ROM'],    # Trace's target IDs to target names
+            #     'OUTSTANDING':  10,                 # Maximal amount of outstanding transactions
+            #     'CHUNK':        65536,              # Records consumed (and read ahead) at once
+            #     'QUEUE':        'AXI_RD'
+            # }
+        },
+
         'QUEUES': {
 
             'AXI_WR': {
@@ -145,7 +207,8 @@ initiators_params = {
                 'OUTSTANDING':   10,        # Maximal amount of outstanding transactions
                 'ADDRESS_GEN':   'random',  # random / raster
                 'BUS_WIDTH':     8,         # Bus width, in bytes
-                'QUEUE':         'AXI_WR'
+                'QUEUE':         'AXI_WR',
+                'BATCH_BURSTS':  0          # 0 = per-beat generation, N = bursts drawn at once (see Initiator_procedure)
             },
 
             'AXI_RD': {
@@ -157,10 +220,22 @@ initiators_params = {
                 'OUTSTANDING':   10,        # Maximal amount of outstanding transactions
                 'ADDRESS_GEN':   'raster',  # random / raster
                 'BUS_WIDTH':     8,         # Bus width, in bytes
-                'QUEUE':         'AXI_RD'
+                'QUEUE':         'AXI_RD',
+                'BATCH_BURSTS':  0          # 0 = per-beat generation, N = bursts drawn at once (see Initiator_procedure)
             }
         },
 
+        'TRACES': {
+            # Trace-driven procedures (see Initiator_trace.py), e.g.:
+            # 'REPLAY': {
+            #     'FILE':         'cpu_trace.npy',    # Recorded transactions trace
+            #     'TARGETS':      ['SRAM', 'ROM'],    # Trace's target IDs to target names
+            #     'OUTSTANDING':  10,                 # Maximal amount of outstanding transactions
+            #     'CHUNK':        65536,              # Records consumed (and read ahead) at once
+            #     'QUEUE':        'AXI_RD'
+            # }
+        },
+
         'QUEUES': {
 
             'AXI_WR': {
@@ -6,13 +6,169 @@
 #                                    |_|
 
 import simpy
+import cProfile
 import include as inc
 from Fabric import Fabric
+from Config import compile_config
+from Calendar_environment import ENVIRONMENTS
 from Auxiliary import Auxiliary
+from Trace_recorder import Trace_recorder
+from Instrumentation import Instrumentation
+from Latency_stats import Latency_stats
+from Random_streams import Random_streams
+from Clock_domains import Clock_domains
+from Steady_state import Steady_state_monitor
+from Transaction import Transaction_pool
 from Target_process import Target_process as Target
 from Initiator_process import Initiator_process as Initiator
 
 
+def environment(global_params):
+    """Returns a new simulation environment, by SCHEDULER (validated along with the rest of the parameters)"""
+
+    return ENVIRONMENTS.get(global_params.get('SCHEDULER'), simpy.Environment)()
+
+
+# ----------------------------------------------------------------------------------------
+def configure(env, global_params, fabric_params, initiators_params, targets_params):
+    """Compiles the given parameters (see Config.py), returns the compiled configuration and its Auxiliary"""
+
+    config = compile_config(global_params, fabric_params, initiators_params, targets_params, Auxiliary(env, 0).error)
+
+    aux = Auxiliary(env, config.GLOBAL.DEBUG_LEVEL, config.GLOBAL.DEBUG_COMPONENTS, config.GLOBAL.DEBUG_RING_SIZE)
+
+    return config, aux
+
+
+# ----------------------------------------------------------------------------------------
+def build(env, aux, config, seed=None):
+    """
+        Creates the testbench entities (Initiators, Targets and Fabric) out of the compiled configuration,
+        their random streams are spawned from the given seed (integer or SeedSequence), by default from SEED
+    """
+
+    tb = {
+        'ENV': env,
+        'AUX': aux,
+        'CONFIG': config,
+        'MODE': config.GLOBAL.EXECUTION_MODE,
+        'IDS': config.IDS,
+        'RNG': Random_streams(config.GLOBAL.SEED if seed is None else seed),
+        'CLOCKS': Clock_domains(env),
+        'RECORDER': None,
+        'INSTRUMENTATION': None,
+        'MEASURE_START_NS': 0,  # Reset after warm-up, see Checkpoint.reset_measurements()
+        'MONITOR': None,
+        'POOL': Transaction_pool(config.GLOBAL.TRANSACTION_POOL)
+    }
+
+    tb['STATS'] = Latency_stats(list(tb['IDS']['TARGETS']))
+
+    # Installed first, hence every component's process is instrumented (see Instrumentation.py):
+    if config.GLOBAL.PROFILE:
+        tb['INSTRUMENTATION'] = Instrumentation(env)
+
+    if config.GLOBAL.TRACE_FILE:
+        tb['RECORDER'] = Trace_recorder(config.GLOBAL.TRACE_FILE, tb['IDS'], config.GLOBAL.TRACE_CHUNK)
+
+    # Create Initiators:
+    tb['INITIATORS'] = {}
+    for initiator_params in config.INITIATORS:
+        tb['INITIATORS'][initiator_params.NAME] = Initiator(initiator_params.NAME, initiator_params, tb)
+
+    # ------------------------------------------------------
+    # Create Targets:
+    tb['TARGETS'] = {}
+    for target_params in config.TARGETS:
+        tb['TARGETS'][target_params.NAME] = Target(target_params.NAME, target_params, tb)
+
+    # ------------------------------------------------------
+    # Create Fabrics, then connect their bridges:
+    tb['FABRICS'] = {}
+    for fabric_params in config.FABRICS:
+        tb['FABRICS'][fabric_params.NAME] = Fabric(fabric_params.NAME, fabric_params, tb)
+
+    for fabric in tb['FABRICS'].values():
+        fabric.connect(tb['FABRICS'], tb)
+
+    if config.GLOBAL.STEADY_STATE:
+        tb['MONITOR'] = Steady_state_monitor(tb)
+
+    if tb['INSTRUMENTATION'] is not None:
+        tb['INSTRUMENTATION'].attach(tb)
+
+    return tb
+
+
+# ----------------------------------------------------------------------------------------
+def run(tb):
+    """Runs the testbench up to SIMULATION_TIME_IN_CYCLES, or until its steady-state metrics converge"""
+
+    if tb['MONITOR'] is not None:
+        tb['ENV'].run(until=tb['MONITOR'].action)
+    else:
+        tb['ENV'].run(until=tb['CONFIG'].GLOBAL.SIMULATION_TIME_IN_CYCLES)
+
+
+# ----------------------------------------------------------------------------------------
+def summarize(tb):
+    """Collects the run's summary metrics out of the testbench entities"""
+
+    summary = {
+        'SIM_TIME_NS':      tb['ENV'].now,
+        'REQUESTS':         0,
+        'OVERFLOWS':        0,
+        'DEQUEUED':         0,
+        'ACKS':             0,
+        'THROUGHPUT_MBPS':  0.0,
+        'LATENCY_P50_NS':   0.0,
+        'LATENCY_P99_NS':   0.0,
+        'LATENCY_MAX_NS':   0.0
+    }
+
+    ack_bytes = 0
+    for initiator in tb['INITIATORS'].values():
+        summary['ACKS'] += initiator.acks
+        ack_bytes += initiator.ack_bytes
+        for queue in initiator.get_queues().values():
+            summary['REQUESTS'] += queue.enqueued
+            summary['OVERFLOWS'] += queue.overflows
+            summary['DEQUEUED'] += queue.dequeued
+
+    measured_ns = tb['ENV'].now - tb['MEASURE_START_NS']
+    if measured_ns > 0:
+        summary['THROUGHPUT_MBPS'] = 1000.0 * ack_bytes / measured_ns
+
+    latency = tb['STATS'].get_total()
+    summary['LATENCY_P50_NS'] = latency.get_percentile(50) / 1000.0
+    summary['LATENCY_P99_NS'] = latency.get_percentile(99) / 1000.0
+    summary['LATENCY_MAX_NS'] = latency.max / 1000.0
+
+    if tb['MONITOR'] is not None:
+        summary.update(tb['MONITOR'].get_results())
+
+    return summary
+
+
+# ----------------------------------------------------------------------------------------
+def simulate(global_params, fabric_params, initiators_params, targets_params, seed=None):
+    """Builds and runs a single testbench (no phase banners), returns its summary metrics (see build for seed)"""
+
+    env = environment(global_params)
+
+    config, aux = configure(env, global_params, fabric_params, initiators_params, targets_params)
+
+    tb = build(env, aux, config, seed)
+
+    run(tb)
+
+    if tb['RECORDER'] is not None:
+        tb['RECORDER'].close()
+
+    return summarize(tb)
+
+
+# ----------------------------------------------------------------------------------------
 def main():
     """
       -----------------------------------------------------------------
@@ -38,44 +194,48 @@ def main():
     -----------------------------------------------------------------       -----------------------------
     """
 
-    env = simpy.Environment()
+    env = environment(inc.global_params)
 
-    aux = Auxiliary(env, inc.global_params['DEBUG_LEVEL'])
-
-    tb = {
-        'ENV': env,
-        'AUX': aux
-    }
+    config, aux = configure(env, inc.global_params, inc.fabric_params, inc.initiators_params, inc.targets_params)
 
     # ========================================================================================
     aux.timestamp(__name__, "Initialization Phase started")
 
-    # Create Initiators:
-    tb['INITIATORS'] = {
-        'CPU':  Initiator('CPU', inc.initiators_params['CPU'], tb),
-        'PCIE': Initiator('PCIE', inc.initiators_params['PCIE'], tb)
-    }
-
-    # ------------------------------------------------------
-    # Create Targets:
-    tb['TARGETS'] = {
-        'SRAM': Target('SRAM', inc.targets_params['SRAM'], tb),
-        'ROM':  Target('ROM', inc.targets_params['ROM'], tb)
-    }
-
-    # ------------------------------------------------------
-    # Create Fabric:
-    tb['FABRIC'] = Fabric('DATA', inc.fabric_params, tb)
+    tb = build(env, aux, config)
 
     aux.timestamp(__name__, "Initialization Phase completed")
 
     # ========================================================================================
     aux.timestamp(__name__, "Run Phase started")
 
-    tb['ENV'].run(until=inc.global_params['SIMULATION_TIME_IN_CYCLES'])
+    profiler = cProfile.Profile() if config.GLOBAL.PROFILE_FILE else None
+    if profiler is not None:
+        profiler.enable()
+
+    run(tb)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(config.GLOBAL.PROFILE_FILE)
 
     aux.timestamp(__name__, "Run Phase completed")
 
+    if profiler is not None:
+        aux.message(__name__, 'Run Phase profile written to %s (python -m pstats %s)' % (
+            config.GLOBAL.PROFILE_FILE, config.GLOBAL.PROFILE_FILE))
+
+    if tb['RECORDER'] is not None:
+        tb['RECORDER'].close()
+
+    # ========================================================================================
+    for key, value in summarize(tb).items():
+        aux.message(__name__, '%s = %s' % (key, value))
+
+    tb['STATS'].report(__name__, aux.message)
+
+    if tb['INSTRUMENTATION'] is not None:
+        tb['INSTRUMENTATION'].report(__name__, aux.message)
+
 
 if __name__ == "__main__":
 